@@ -0,0 +1,218 @@
+"""Generation of specialized decoders for bpack descriptors.
+
+Generic bpack decoders walk the list of fields and apply converters at
+each call.
+For descriptors with a fixed layout, like ISP headers, it is possible to
+generate once a straight-line decoding function that unpacks the input
+bytes in a single call to a precompiled :class:`struct.Struct` and then
+extracts all the fields (including the ones of nested descriptors) from
+the unpacked words using shifts and masks.
+"""
+
+import enum
+import struct
+from typing import Any, Callable, Dict, List
+from functools import lru_cache
+
+import bpack
+import bpack.descriptors
+
+__all__ = ["make_decoder"]
+
+
+_FLOAT_FMT = {
+    16: "e",
+    32: "f",
+    64: "d",
+}
+
+_BOOL_TABLE = (False, True)
+
+_WORD_FMT = {
+    8: "Q",
+    4: "I",
+    2: "H",
+    1: "B",
+}
+
+
+@lru_cache(maxsize=None)
+def _make_enum_table(enum_type, nbits: int):
+    """Return a table mapping raw values to the enum members.
+
+    If all the values that can be represented with `nbits` are valid,
+    the table is a tuple indexed by the raw value, otherwise it is a
+    dictionary and the lookup of invalid values raises KeyError.
+    """
+    members = {}
+    for value in range(2**nbits):
+        try:
+            members[value] = enum_type(value)
+        except ValueError:
+            pass
+    if len(members) == 2**nbits:
+        return tuple(members.values())
+    return members
+
+
+class _CodeGenerator:
+    def __init__(self, descriptor):
+        self.namespace: Dict[str, Any] = {}
+        self._names: Dict[int, str] = {}
+
+        leaves = list(self._iter_leaves(descriptor))
+        size = bpack.calcsize(descriptor, bpack.EBaseUnits.BYTES)
+        layout = self._make_layout(leaves, size)
+        self.fmt, self.nitems, self._words, self._floats = layout
+
+    @classmethod
+    def _iter_leaves(cls, descriptor, offset: int = 0):
+        for fd in bpack.descriptors.field_descriptors(descriptor):
+            if bpack.is_descriptor(fd.type):
+                yield from cls._iter_leaves(fd.type, offset + fd.offset)
+            else:
+                yield offset + fd.offset, fd
+
+    @staticmethod
+    def _make_layout(leaves, size: int):
+        """Compute the struct format of words used to unpack the data.
+
+        Float fields are unpacked as individual items, all the other
+        bytes are grouped in unsigned integer words that are as large as
+        possible.
+        """
+        floats = {}
+        for offset, fd in leaves:
+            if fd.repeat is not None:
+                raise TypeError(f"sequence fields are not supported ({fd!r})")
+            if fd.type is float:
+                if offset % 8 or fd.size not in _FLOAT_FMT:
+                    raise TypeError(f"unsupported float field ({fd!r})")
+                floats[offset // 8] = fd.size // 8
+
+        fmt = []
+        words = []  # (item index, start bit, size in bits)
+        float_items = {}  # start bit -> item index
+        pos = 0
+        while pos < size:
+            if pos in floats:
+                float_items[pos * 8] = len(fmt)
+                fmt.append(_FLOAT_FMT[floats[pos] * 8])
+                pos += floats[pos]
+                continue
+            stop = min([offset for offset in floats if offset > pos] + [size])
+            for nbytes in _WORD_FMT:
+                while stop - pos >= nbytes:
+                    words.append((len(fmt), pos * 8, nbytes * 8))
+                    fmt.append(_WORD_FMT[nbytes])
+                    pos += nbytes
+
+        return ">" + "".join(fmt), len(fmt), words, float_items
+
+    def _name(self, obj, prefix: str = "_c") -> str:
+        key = id(obj)
+        name = self._names.get(key)
+        if name is None:
+            name = f"{prefix}{len(self._names)}"
+            self._names[key] = name
+            self.namespace[name] = obj
+        return name
+
+    def _bits(self, offset: int, size: int) -> str:
+        stop = offset + size
+        parts = []
+        for index, wstart, wsize in self._words:
+            wstop = wstart + wsize
+            lo, hi = max(offset, wstart), min(stop, wstop)
+            if lo >= hi:
+                continue
+            expr = f"w{index}"
+            shift = wstop - hi
+            if shift:
+                expr = f"{expr} >> {shift}"
+            if hi - lo < wsize:
+                expr = f"{expr} & {(1 << (hi - lo)) - 1:#x}"
+            lshift = stop - hi
+            if lshift:
+                expr = f"({expr}) << {lshift}"
+            parts.append(expr)
+        return f"({' | '.join(parts)})"
+
+    def field_expr(self, fd, offset: int) -> str:
+        if bpack.is_descriptor(fd.type):
+            return self.descriptor_expr(fd.type, offset)
+        if fd.type is float:
+            return f"w{self._floats[offset]}"
+
+        value = self._bits(offset, fd.size)
+        if fd.type is bool:
+            if fd.size == 1:
+                return f"{self._name(_BOOL_TABLE, '_b')}[{value}]"
+            return f"{value} != 0"
+        elif fd.type is bytes:
+            if fd.size % 8:
+                raise TypeError(f"unsupported bytes field ({fd!r})")
+            return f"{value}.to_bytes({fd.size // 8}, 'big')"
+        elif issubclass(fd.type, enum.Enum):
+            table = _make_enum_table(fd.type, fd.size)
+            return f"{self._name(table, '_e')}[{value}]"
+        elif fd.signed:
+            return f"{value} - ({value} >> {fd.size - 1} << {fd.size})"
+        return value
+
+    def descriptor_expr(self, descriptor, offset: int = 0) -> str:
+        args = [
+            self.field_expr(fd, offset + fd.offset)
+            for fd in bpack.descriptors.field_descriptors(descriptor)
+        ]
+        return f"{self._name(descriptor)}({', '.join(args)})"
+
+
+@lru_cache(maxsize=None)
+def make_decoder(descriptor) -> Callable:
+    """Generate a specialized decoding function for the input descriptor.
+
+    The returned function has signature ``decode(data, offset=0)`` and
+    returns the same object returned by ``descriptor.frombytes(data)``
+    (for ``offset=0``).
+
+    Only descriptors with bit base units, big endian byte order, and
+    fields of type int, bool, bytes, float (byte aligned), enum or
+    nested descriptors are supported.
+    """
+    if bpack.baseunits(descriptor) is not bpack.EBaseUnits.BITS:
+        raise TypeError(f"unsupported base units ({descriptor!r})")
+    if bpack.byteorder(descriptor) is not bpack.EByteOrder.BE:
+        raise TypeError(f"unsupported byte order ({descriptor!r})")
+
+    nbits = bpack.calcsize(descriptor, bpack.EBaseUnits.BITS)
+    if nbits % 8:
+        raise TypeError("descriptor size is not a multiple of 8 bits")
+
+    generator = _CodeGenerator(descriptor)
+    expr = generator.descriptor_expr(descriptor)
+    words = ", ".join(f"w{index}" for index in range(generator.nitems))
+    lines: List[str] = [
+        "def decode(data, offset=0):",
+        "    try:",
+        f"        {words}, = unpack_from(data, offset)",
+        "    except struct_error as exc:",
+        "        raise ValueError(str(exc)) from exc",
+        "    try:",
+        f"        return {expr}",
+        "    except LookupError as exc:",
+        "        raise ValueError(f'invalid enum value: {exc}') from None",
+    ]
+    source = "\n".join(lines)
+
+    namespace = dict(
+        generator.namespace,
+        unpack_from=struct.Struct(generator.fmt).unpack_from,
+        struct_error=struct.error,
+    )
+    code = compile(source, f"<decoder of {descriptor.__name__}>", "exec")
+    exec(code, namespace)  # noqa: S102
+    decode = namespace["decode"]
+    decode.__doc__ = f"Decode a :class:`{descriptor.__name__}` instance."
+    decode.__source__ = source
+    return decode
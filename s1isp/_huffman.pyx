@@ -12,6 +12,13 @@ cdef extern from "huffman.h" nogil:
     int huffman_brc3(int, const uint8_t*, int, uint8_t*)
     int huffman_brc4(int, const uint8_t*, int, uint8_t*)
 
+    int HUFFMAN_ERR_EOD
+    int HUFFMAN_ERR_BRC
+    void huffman_init_luts()
+    int huffman_decode_fdbaq(
+        const uint8_t*, size_t, int, int,
+        uint8_t*, uint8_t*, uint8_t*, uint8_t*, uint8_t*, uint8_t*)
+
 
 import numpy as np
 cimport numpy as cnp
@@ -21,6 +28,9 @@ class HuffmanDecodingError(ValueError):
     pass
 
 
+huffman_init_luts()
+
+
 def decode(
     const uint8_t[::1] data not None,
     int nsamples,
@@ -99,3 +109,67 @@ def decode(
     else:
         return np.asarray(out)
 
+
+def decode_fdbaq(
+    const uint8_t[::1] data not None,
+    int nq,
+    int blocksize=128,
+):
+    """Decode the Huffman encoded channels of FDBAQ user data.
+
+    Differently from :func:`decode`, the input data are packed bytes
+    (8 bits per byte), as stored in the ISP user data field.
+    All the four channels (IE, IO, QE and QO) are decoded in a single
+    call, together with the BRC and THIDX codes of each block, taking
+    into account the padding to 16 bits words at the end of each channel.
+
+    :param data: np.ndarray or typed memory view of uint8 values
+        the user data field bytes
+    :param nq: int
+        number of quads
+    :param blocksize: int
+        number of quads per block (default: 128)
+    :returns:
+        the tuple (ie, io, qe, qo, brc, thidx) of uint8 arrays;
+        values of the four channels are encoded as in :func:`decode`
+    """
+    cdef Py_ssize_t nbytes = data.shape[0]
+    cdef int ret = 0
+
+    if nq < 0:
+        raise ValueError(f"Invalid number of quads: {nq}")
+    if blocksize < 1:
+        raise ValueError(f"Invalid blocksize: {blocksize}")
+
+    nb = (nq + blocksize - 1) // blocksize
+    cdef uint8_t[::1] ie = np.empty(nq, dtype=np.uint8)
+    cdef uint8_t[::1] io = np.empty(nq, dtype=np.uint8)
+    cdef uint8_t[::1] qe = np.empty(nq, dtype=np.uint8)
+    cdef uint8_t[::1] qo = np.empty(nq, dtype=np.uint8)
+    cdef uint8_t[::1] brc = np.empty(nb, dtype=np.uint8)
+    cdef uint8_t[::1] thidx = np.empty(nb, dtype=np.uint8)
+
+    if nq > 0:
+        if nbytes < 1:
+            raise ValueError("The input 'data' array is empty.")
+        with nogil:
+            ret = huffman_decode_fdbaq(
+                &data[0], nbytes, nq, blocksize,
+                &ie[0], &io[0], &qe[0], &qo[0], &brc[0], &thidx[0],
+            )
+
+    if ret == HUFFMAN_ERR_BRC:
+        raise HuffmanDecodingError("Invalid BRC code in FDBAQ data.")
+    elif ret < 0:
+        raise HuffmanDecodingError(
+            f"Not enough data to decode the requested quads ({nq})."
+        )
+
+    return (
+        np.asarray(ie),
+        np.asarray(io),
+        np.asarray(qe),
+        np.asarray(qo),
+        np.asarray(brc),
+        np.asarray(thidx),
+    )
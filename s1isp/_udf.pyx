@@ -0,0 +1,154 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+
+"""Extension module for the reconstruction of Sentinel-1 RAW data samples."""
+
+from libc.stdint cimport uint8_t
+
+
+import numpy as np
+cimport numpy as cnp
+
+
+def reconstruct(
+    const float[:, ::1] luts not None,
+    const uint8_t[::1] ie not None,
+    const uint8_t[::1] io not None,
+    const uint8_t[::1] qe not None,
+    const uint8_t[::1] qo not None,
+    int nq,
+    int blocksize,
+    float[:, ::1] out=None,
+):
+    """Reconstruct and align samples using one look-up table per block.
+
+    The LUT gather and the alignment of the quads are performed in a
+    single pass, writing the output array directly (no intermediate
+    array of reconstructed samples is allocated).
+
+    :param luts: 2D array of float32
+        reconstruction LUTs, one row per block
+    :param ie, io, qe, qo: arrays of uint8
+        sample codes of the in phase (i) and in quadrature (q) components
+        of even (e) and odd (o) samples
+    :param nq: int
+        number of quads to reconstruct
+    :param blocksize: int
+        number of quads per block
+    :param out: (optional) 2D output array of float32 with shape (nq, 4)
+        if provided the reconstructed data are stored in the 'out' array,
+        typically a float32 view of the complex64 output data
+    :returns:
+        the (nq, 4) float32 array with (ie, qe, io, qo) values per row,
+        i.e. the float32 view of 2 * nq complex64 samples
+    """
+    cdef Py_ssize_t nb = luts.shape[0]
+    cdef Py_ssize_t lutsize = luts.shape[1]
+    cdef Py_ssize_t idx, bidx
+    cdef const float *lut
+
+    if blocksize < 1:
+        raise ValueError(f"Invalid blocksize: {blocksize}")
+    if nq > min(ie.shape[0], io.shape[0], qe.shape[0], qo.shape[0]):
+        raise ValueError(f"Not enough input samples to decode {nq} quads.")
+    if nb < (nq + blocksize - 1) // blocksize:
+        raise ValueError(f"Not enough LUTs to decode {nq} quads.")
+
+    if out is None:
+        out = np.empty((nq, 4), dtype=np.float32)
+    elif out.shape[0] != nq or out.shape[1] != 4:
+        raise ValueError(
+            f"Invalid output array shape: ({out.shape[0]}, {out.shape[1]}) "
+            f"(({nq}, 4) expected)."
+        )
+
+    with nogil:
+        for idx in range(nq):
+            bidx = idx // blocksize
+            lut = &luts[bidx, 0]
+            if (
+                ie[idx] >= lutsize or io[idx] >= lutsize
+                or qe[idx] >= lutsize or qo[idx] >= lutsize
+            ):
+                break
+            out[idx, 0] = lut[ie[idx]]
+            out[idx, 1] = lut[qe[idx]]
+            out[idx, 2] = lut[io[idx]]
+            out[idx, 3] = lut[qo[idx]]
+        else:
+            idx = -1
+
+    if idx >= 0:
+        raise IndexError(f"Sample code out of LUT range (quad {idx}).")
+
+    return np.asarray(out)
+
+
+cdef inline float _smag10(const uint8_t *data, Py_ssize_t bitpos) nogil:
+    # 10 bits sign and magnitude sample: even bit offset within the byte
+    # (0, 2, 4 or 6) so the sample always fits in two consecutive bytes
+    cdef Py_ssize_t byte = bitpos >> 3
+    cdef unsigned int word = (data[byte] << 8) | data[byte + 1]
+    cdef unsigned int value = (word >> (6 - (bitpos & 7))) & 0x3FF
+    cdef float magnitude = value & 0x1FF
+    return -magnitude if value & 0x200 else magnitude
+
+
+def bypass(
+    const uint8_t[::1] data not None,
+    int nq,
+    float[:, ::1] out=None,
+):
+    """Decode and align bypass (data format A and B) samples.
+
+    Samples are 10 bits sign and magnitude integers packed in four
+    channels (IE, IO, QE and QO) each one padded to 16 bits words.
+    The unpacking, the conversion to float and the alignment of the quads
+    are performed in a single pass.
+
+    :param data: array of uint8
+        the user data field bytes
+    :param nq: int
+        number of quads
+    :param out: (optional) 2D output array of float32 with shape (nq, 4)
+        if provided the decoded data are stored in the 'out' array,
+        typically a float32 view of the complex64 output data
+    :returns:
+        the (nq, 4) float32 array with (ie, qe, io, qo) values per row,
+        i.e. the float32 view of 2 * nq complex64 samples
+    """
+    cdef Py_ssize_t nbytes = 2 * ((10 * <Py_ssize_t>nq + 15) // 16)
+    cdef Py_ssize_t idx, bitpos
+    cdef const uint8_t *ie
+    cdef const uint8_t *io
+    cdef const uint8_t *qe
+    cdef const uint8_t *qo
+
+    if nq < 0:
+        raise ValueError(f"Invalid number of quads: {nq}")
+    if data.shape[0] < 4 * nbytes:
+        raise ValueError(f"Not enough input data to decode {nq} quads.")
+
+    if out is None:
+        out = np.empty((nq, 4), dtype=np.float32)
+    elif out.shape[0] != nq or out.shape[1] != 4:
+        raise ValueError(
+            f"Invalid output array shape: ({out.shape[0]}, {out.shape[1]}) "
+            f"(({nq}, 4) expected)."
+        )
+
+    if nq == 0:
+        return np.asarray(out)
+
+    ie = &data[0]
+    io = ie + nbytes
+    qe = io + nbytes
+    qo = qe + nbytes
+    with nogil:
+        for idx in range(nq):
+            bitpos = 10 * idx
+            out[idx, 0] = _smag10(ie, bitpos)
+            out[idx, 1] = _smag10(qe, bitpos)
+            out[idx, 2] = _smag10(io, bitpos)
+            out[idx, 3] = _smag10(qo, bitpos)
+
+    return np.asarray(out)
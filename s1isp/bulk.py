@@ -0,0 +1,598 @@
+"""Vectorized decoding of ISP headers.
+
+Decoding ISPs one by one produces a (nested) Python object per packet.
+Functions in this module decode the headers of many ISPs at once, from a
+single buffer, into a "structure of arrays" (SoA): a dictionary mapping
+each (leaf) field name to a :class:`numpy.ndarray` with one item per ISP.
+"""
+
+import enum
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+import bpack
+import numpy as np
+import bpack.descriptors
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .luts import (
+    lookup_d_value,
+    lookup_filter_output_offset,
+    lookup_range_decimation_info,
+)
+from .enums import ERangeDecimation
+from .decoder import SUB_COMM_LEN
+from .constants import REF_FREQ, SYNC_MARKER
+from .constants import PRIMARY_HEADER_SIZE as PHSIZE
+from .constants import SECONDARY_HEADER_SIZE as SHSIZE
+from .descriptors import (
+    PrimaryHeader,
+    SecondaryHeader,
+    SyncMarkerError,
+    PVTAncillaryData,
+    AttitudeAncillaryData,
+    HKTemperatureAncillaryData,
+    _HK_NTILES,
+    _REF_PERIOD_SEC,
+    _FINE_TIME_SCALE,
+    _TX_RAMP_RATE_SCALE,
+    _TX_PULSE_START_FREQ_SCALE,
+    _HK_TILE_TEMPERATURE_FIELDS,
+)
+
+__all__ = [
+    "decode_primary_headers",
+    "decode_secondary_headers",
+    "record_from_arrays",
+    "check_sync_marker",
+    "get_baq_block_len_samples",
+    "get_rx_gain_db",
+    "get_tx_pulse_length_sec",
+    "get_tx_pulse_length_samples",
+    "get_tx_ramp_rate_hz_per_sec",
+    "get_tx_pulse_start_freq_hz",
+    "get_pri_sec",
+    "get_swst_sec",
+    "get_swl_sec",
+    "get_fine_time_sec",
+    "get_time_sec",
+    "get_swl_n3rx_samples",
+    "get_tile_temperatures",
+    "reassemble_subcomm",
+    "PVT_DTYPE",
+    "ATT_DTYPE",
+    "decode_pvt",
+    "decode_attitude",
+    "HK_DTYPE",
+    "decode_hk",
+]
+
+
+def _iter_fields(
+    descriptor, offset: int = 0
+) -> Iterator[Tuple[str, int, Any]]:
+    """Iterate over leaf fields yielding (name, bit offset, descriptor)."""
+    fields = bpack.fields(descriptor)
+    field_descriptors = bpack.descriptors.field_descriptors(descriptor)
+    for field, fd in zip(fields, field_descriptors):
+        if bpack.is_descriptor(fd.type):
+            yield from _iter_fields(fd.type, offset + fd.offset)
+        else:
+            yield field.name, offset + fd.offset, fd
+
+
+def _get_leaf_fields(descriptor):
+    leaves = list(_iter_fields(descriptor))
+    names = [name for name, _, _ in leaves]
+    assert len(set(names)) == len(names), "duplicate field names"
+    return leaves
+
+
+_PH_FIELDS = _get_leaf_fields(PrimaryHeader)
+_SH_FIELDS = _get_leaf_fields(SecondaryHeader)
+
+
+def _uint_dtype(nbits: int) -> np.dtype:
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if nbits <= np.iinfo(dtype).bits:
+            return np.dtype(dtype)
+    raise ValueError(f"unsupported field size: {nbits} bits")
+
+
+def _extract_field(raw: np.ndarray, offset: int, fd) -> np.ndarray:
+    """Extract a field from a 2D array of bytes (one row per record)."""
+    start = offset // 8
+    stop = (offset + fd.size + 7) // 8
+    if fd.type is float:
+        dtype = np.dtype(f">f{fd.size // 8}")
+        data = np.ascontiguousarray(raw[:, start:stop]).view(dtype)
+        return data.ravel().astype(dtype.newbyteorder("="))
+
+    nbytes = stop - start
+    if nbytes > 8:
+        raise ValueError(f"unsupported field size: {fd.size} bits")
+    if nbytes in (1, 2, 4, 8):
+        # read the enclosing big endian word with a single view
+        dtype = np.dtype(f">u{nbytes}")
+        data = np.ascontiguousarray(raw[:, start:stop]).view(dtype)
+        value = data.ravel().astype(dtype.newbyteorder("="))
+    else:
+        value = raw[:, start].astype(np.uint64)
+        for idx in range(start + 1, stop):
+            value <<= np.uint64(8)
+            value |= raw[:, idx]
+    wtype = value.dtype.type
+    shift = stop * 8 - offset - fd.size
+    if shift:
+        value >>= wtype(shift)
+    if fd.size < value.dtype.itemsize * 8:
+        value &= wtype((1 << fd.size) - 1)
+
+    if fd.type is bool:
+        return value != 0
+    return value.astype(_uint_dtype(fd.size))
+
+
+def _decode_records(buf, offsets, offset, fields, size):
+    data = np.frombuffer(buf, dtype=np.uint8)
+    offsets = np.asarray(offsets, dtype=np.intp) + offset
+    # gather the records as rows of a 2D array without building the
+    # (N, size) array of indices
+    raw = sliding_window_view(data, size)[offsets]
+    return {
+        name: _extract_field(raw, offset, fd) for name, offset, fd in fields
+    }
+
+
+def decode_primary_headers(buf, offsets) -> Dict[str, np.ndarray]:
+    """Decode the primary headers of many ISPs at once.
+
+    :param buf:
+        bytes-like object (or 1D :class:`numpy.ndarray` of uint8)
+        containing the ISPs, e.g. the memory mapped L0 file
+    :param offsets:
+        offsets (in bytes) of the ISPs in `buf`, e.g. as returned by
+        :func:`s1isp.decoder.scan_stream` (excluding the last item)
+    :returns:
+        a dictionary mapping the names of the fields of
+        :class:`s1isp.descriptors.PrimaryHeader` to arrays with one
+        item per ISP
+
+    Use :func:`record_from_arrays` to get the
+    :class:`s1isp.descriptors.PrimaryHeader` of a specific ISP.
+    """
+    return _decode_records(buf, offsets, 0, _PH_FIELDS, PHSIZE)
+
+
+def decode_secondary_headers(
+    buf, offsets, header_offset: int = PHSIZE, check_sync: bool = False
+) -> Dict[str, np.ndarray]:
+    """Decode the secondary headers of many ISPs at once.
+
+    :param buf:
+        bytes-like object (or 1D :class:`numpy.ndarray` of uint8)
+        containing the ISPs, e.g. the memory mapped L0 file
+    :param offsets:
+        offsets (in bytes) of the ISPs in `buf`, e.g. as returned by
+        :func:`s1isp.decoder.scan_stream` (excluding the last item)
+    :param header_offset:
+        offset of the secondary header with respect to the beginning of
+        each ISP (by default the size of the primary header)
+    :param check_sync:
+        if True raise :exc:`s1isp.descriptors.SyncMarkerError` if any
+        of the ISPs has an unexpected sync marker
+    :returns:
+        a dictionary mapping the names of the leaf fields of
+        :class:`s1isp.descriptors.SecondaryHeader` to arrays with one
+        item per ISP.
+        Enums are represented by their raw integer values, bytes fields
+        as unsigned integers.
+        The additional "bad_sync_marker" boolean array flags ISPs with
+        an unexpected sync marker.
+
+    Use :func:`record_from_arrays` to get the
+    :class:`s1isp.descriptors.SecondaryHeader` of a specific ISP.
+    """
+    arrays = _decode_records(buf, offsets, header_offset, _SH_FIELDS, SHSIZE)
+    arrays["bad_sync_marker"] = arrays["sync_marker"] != SYNC_MARKER
+    if check_sync:
+        check_sync_marker(arrays["sync_marker"])
+
+    return arrays
+
+
+def check_sync_marker(sync_marker: np.ndarray) -> None:
+    """Check the sync marker of many ISPs at once.
+
+    :param sync_marker:
+        array of sync markers, e.g. the "sync_marker" item of the
+        dictionary returned by :func:`decode_secondary_headers`
+    :raises s1isp.descriptors.SyncMarkerError:
+        if any of the sync markers is not equal to
+        :data:`s1isp.constants.SYNC_MARKER`.
+        The error message reports the (1-based) count of the first
+        invalid ISP, consistently with :func:`s1isp.decoder.decode_stream`
+    """
+    bad = np.flatnonzero(np.asarray(sync_marker) != SYNC_MARKER)
+    if bad.size:
+        raise SyncMarkerError(f"packet count: {bad[0] + 1}")
+
+
+def record_from_arrays(
+    arrays: Dict[str, np.ndarray], index: int, descriptor=SecondaryHeader
+):
+    """Build a record from the arrays at the specified index.
+
+    `arrays` is a dictionary of arrays like the one returned by
+    :func:`decode_secondary_headers`.
+    By default a :class:`s1isp.descriptors.SecondaryHeader` is returned,
+    but any of the nested descriptors (e.g.
+    :class:`s1isp.descriptors.RadarConfigurationSupportService`) can be
+    requested.
+    """
+    values = []
+    fields = bpack.fields(descriptor)
+    field_descriptors = bpack.descriptors.field_descriptors(descriptor)
+    for field, fd in zip(fields, field_descriptors):
+        if bpack.is_descriptor(fd.type):
+            value = record_from_arrays(arrays, index, fd.type)
+        else:
+            value = arrays[field.name][index].item()
+            if fd.type is bytes:
+                value = value.to_bytes(fd.size // 8, "big")
+            elif issubclass(fd.type, enum.Enum):
+                value = fd.type(value)
+        values.append(value)
+    return descriptor(*values)
+
+
+# === Radar Configuration Support Service ===
+# Vectorized versions of RadarConfigurationSupportService methods
+def get_baq_block_len_samples(baq_block_length: np.ndarray) -> np.ndarray:
+    """Length of the BAQ data block (S1-IF-ASD-PL-0007, section 3.2.5.3)."""
+    return 8 * (np.asarray(baq_block_length, dtype=np.int64) + 1)
+
+
+def get_rx_gain_db(rx_gain: np.ndarray) -> np.ndarray:
+    """Rx Gain in dB (S1-IF-ASD-PL-0007, section 3.2.5.5)."""
+    return -0.5 * np.asarray(rx_gain, dtype=np.float64)
+
+
+def _sign_magnitude_to_float(x: np.ndarray) -> np.ndarray:
+    # sign/magnitude 16 bits words: sign bit set -> positive
+    x = np.asarray(x, dtype=np.int32)
+    sign = ((x >> 14) & 0b10) - 1
+    return (sign * (x & 0b0111111111111111)).astype(np.float64)
+
+
+def get_tx_ramp_rate_hz_per_sec(tx_ramp_rate: np.ndarray) -> np.ndarray:
+    """Tx Pulse Ramp Rate [Hz/s] (S1-IF-ASD-PL-0007, section 3.2.5.6)."""
+    value = _sign_magnitude_to_float(tx_ramp_rate)
+    return value * _TX_RAMP_RATE_SCALE * 1e12
+
+
+def get_tx_pulse_start_freq_hz(
+    tx_pulse_start_freq: np.ndarray, tx_ramp_rate: np.ndarray
+) -> np.ndarray:
+    """Tx Pulse Start Frequency [Hz] (S1-IF-ASD-PL-0007, section 3.2.5.7)."""
+    ramp_rate = _sign_magnitude_to_float(tx_ramp_rate) * _TX_RAMP_RATE_SCALE
+    value = _sign_magnitude_to_float(tx_pulse_start_freq)
+    return 1e6 * (
+        ramp_rate / (4 * REF_FREQ) + value * _TX_PULSE_START_FREQ_SCALE
+    )
+
+
+def get_tx_pulse_length_sec(tx_pulse_length: np.ndarray) -> np.ndarray:
+    """Tx Pulse Length [s] (S1-IF-ASD-PL-0007, section 3.2.5.8)."""
+    return np.asarray(tx_pulse_length, dtype=np.float64) * _REF_PERIOD_SEC
+
+
+def get_pri_sec(pri: np.ndarray) -> np.ndarray:
+    """Pulse Repetition Interval [s] (S1-IF-ASD-PL-0007, section 3.2.5.10)."""
+    return np.asarray(pri, dtype=np.float64) * _REF_PERIOD_SEC
+
+
+def get_swst_sec(swst: np.ndarray) -> np.ndarray:
+    """Return the Sampling Window Start Time [s].
+
+    See S1-IF-ASD-PL-0007, section 3.2.5.11.
+    """
+    return np.asarray(swst, dtype=np.float64) * _REF_PERIOD_SEC
+
+
+def get_swl_sec(swl: np.ndarray) -> np.ndarray:
+    """Return the Sampling Window Length [s].
+
+    See S1-IF-ASD-PL-0007, section 3.2.5.12.
+    """
+    return np.asarray(swl, dtype=np.float64) * _REF_PERIOD_SEC
+
+
+def get_fine_time_sec(fine_time: np.ndarray) -> np.ndarray:
+    """Fine time [s] (S1-IF-ASD-PL-0007, section 3.2.1.2)."""
+    return (np.asarray(fine_time, dtype=np.float64) + 0.5) * _FINE_TIME_SCALE
+
+
+def get_time_sec(coarse_time: np.ndarray, fine_time: np.ndarray) -> np.ndarray:
+    """Return the ISP time stamp [s], i.e. coarse time plus fine time.
+
+    See S1-IF-ASD-PL-0007, section 3.2.1.
+    """
+    coarse_time = np.asarray(coarse_time, dtype=np.float64)
+    return coarse_time + get_fine_time_sec(fine_time)
+
+
+def _make_range_decimation_tables():
+    """Build tables of range decimation parameters indexed by code.
+
+    Invalid codes have a zero denominator.
+    """
+    size = 2**8  # the range decimation code is a 8 bits field
+    num = np.zeros(size, dtype=np.int64)
+    den = np.zeros(size, dtype=np.int64)
+    filter_output_offset = np.zeros(size, dtype=np.int64)
+    max_den = max(
+        lookup_range_decimation_info(rdcode).decimation_ratio.denominator
+        for rdcode in ERangeDecimation
+    )
+    d_table = np.zeros((size, max_den), dtype=np.int64)
+    for rdcode in ERangeDecimation:
+        ratio = lookup_range_decimation_info(rdcode).decimation_ratio
+        num[rdcode] = ratio.numerator
+        den[rdcode] = ratio.denominator
+        filter_output_offset[rdcode] = lookup_filter_output_offset(rdcode)
+        for c in range(ratio.denominator):
+            d_table[rdcode, c] = lookup_d_value(rdcode, c)
+    return num, den, filter_output_offset, d_table
+
+
+_RD_NUM, _RD_DEN, _RD_FILTER_OUTPUT_OFFSET, _D_TABLE = (
+    _make_range_decimation_tables()
+)
+
+
+def _get_rd_den(rdcode: np.ndarray) -> np.ndarray:
+    den = _RD_DEN[rdcode]
+    if not den.all():
+        invalid = np.unique(rdcode[den == 0])
+        raise ValueError(f"invalid range decimation code(s): {invalid}")
+    return den
+
+
+def get_swl_n3rx_samples(
+    range_decimation: np.ndarray, swl: np.ndarray
+) -> np.ndarray:
+    """Return the sampling Window Length in samples after the decimation.
+
+    Number of complex samples (I/Q pairs) after decimation (i.e. in the
+    Space Packet).
+    See S1-IF-ASD-PL-0007, section 3.2.5.12.
+    """
+    rdcode = np.asarray(range_decimation, dtype=np.intp)
+    swl = np.asarray(swl, dtype=np.int64)
+    den = _get_rd_den(rdcode)
+    b = 2 * swl - _RD_FILTER_OUTPUT_OFFSET[rdcode] - 17
+    # truncation (towards zero also for b < 0) as in
+    # RadarConfigurationSupportService.get_swl_n3rx_samples
+    q = np.sign(b) * (np.abs(b) // den)
+    c = b - den * q
+    d = _D_TABLE[rdcode, c % den]  # negative C wraps as in lookup_d_value
+    return 2 * (_RD_NUM[rdcode] * q + d + 1)
+
+
+def get_tx_pulse_length_samples(
+    range_decimation: np.ndarray, tx_pulse_length: np.ndarray
+) -> np.ndarray:
+    """Tx Pulse Length in samples in the space packet (N3_Tx).
+
+    Number of complex Tx pulse samples (I/Q pairs) after the decimation
+    (i.e. in Space Packet).
+
+    See S1-IF-ASD-PL-0007, section 3.2.5.8.
+    """
+    rdcode = np.asarray(range_decimation, dtype=np.intp)
+    tx_pulse_length = np.asarray(tx_pulse_length, dtype=np.int64)
+    den = _get_rd_den(rdcode)
+    return -(-tx_pulse_length * 4 * _RD_NUM[rdcode] // den)
+
+
+# === Sub-commutated Ancillary Data ===
+def reassemble_subcomm(
+    data_word_index: np.ndarray,
+    data_word: np.ndarray,
+    packet_count: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Reassemble sub-commutated data words into cycles of 64 words.
+
+    Cycles are split as in :class:`s1isp.decoder.SubCommutatedDataDecoder`:
+    a new cycle starts when the word index decreases with respect to
+    the previous (valid) word, after the last word of a cycle, or, if
+    `packet_count` is provided, when packets are missing.
+    Repeated indices do not start a new cycle.
+    Words with index 0 (no data) are ignored.
+
+    A cycle is complete if it contains exactly one word for each index.
+    Please note that :class:`s1isp.decoder.SubCommutatedDataDecoder`
+    only counts words, so a cycle of 64 words with a repeated index
+    (and hence a missing one) is complete for it, but not for this
+    function.
+
+    :param data_word_index:
+        the "data_word_index" column of the secondary headers
+        (see :func:`decode_secondary_headers`)
+    :param data_word:
+        the "data_word" column of the secondary headers
+    :param packet_count:
+        optional array of packet counters used to detect data gaps
+    :returns:
+        a tuple containing the (n_cycles, 64) array of big endian data
+        words, and the boolean array flagging complete cycles.
+        Missing words are set to zero.
+
+    The raw PVT, attitude and HK records of complete cycles can be
+    obtained by slicing the words array and converting it to bytes,
+    e.g. ``decode_pvt(words[complete, 0:22].tobytes())``.
+    """
+    index = np.asarray(data_word_index, dtype=np.intp)
+    data = np.asarray(data_word, dtype=np.uint16)
+    if np.any(index > SUB_COMM_LEN):
+        raise ValueError(f"invalid word index: {index.max()}")
+
+    valid = index > 0
+    index = index[valid]
+    data = data[valid]
+
+    new_cycle = np.ones(len(index), dtype=bool)
+    new_cycle[1:] = (index[1:] < index[:-1]) | (index[:-1] == SUB_COMM_LEN)
+    if packet_count is not None:
+        packet_count = np.asarray(packet_count, dtype=np.int64)[valid]
+        new_cycle[1:] |= np.diff(packet_count) > 1
+    cycle = np.cumsum(new_cycle) - 1
+
+    ncycles = int(new_cycle.sum())
+    words = np.zeros((ncycles, SUB_COMM_LEN), dtype=">u2")
+    filled = np.zeros((ncycles, SUB_COMM_LEN), dtype=bool)
+    words[cycle, index - 1] = data
+    filled[cycle, index - 1] = True
+    nwords = np.bincount(cycle, minlength=ncycles)
+
+    return words, filled.all(axis=1) & (nwords == SUB_COMM_LEN)
+
+
+# === PVT and Attitude Ancillary Data ===
+# Raw (big endian) layout of PVT records (S1-IF-ASD-PL-0007, table 3.2-5).
+# The 56 bits time stamp is preceded by 8 bits of padding, so it is
+# described by a 64 bits field that has to be masked.
+PVT_DTYPE = np.dtype(
+    {
+        "names": ["x", "y", "z", "vx", "vy", "vz", "_time_stamp"],
+        "formats": [">f8", ">f8", ">f8", ">f4", ">f4", ">f4", ">u8"],
+        "offsets": [0, 8, 16, 24, 28, 32, 36],
+        "itemsize": PVTAncillaryData._BPACK_SIZE_BYTES,
+    }
+)
+
+# Raw (big endian) layout of Attitude records
+# (S1-IF-ASD-PL-0007, tables 3.2-6 and 3.2-8).
+# The 56 bits time stamp is preceded by 8 bits of padding, and the
+# pointing status error flags are the 3 least significant bits of the
+# last byte.
+ATT_DTYPE = np.dtype(
+    {
+        "names": [
+            "q0",
+            "q1",
+            "q2",
+            "q3",
+            "omega_x",
+            "omega_y",
+            "omega_z",
+            "_time_stamp",
+            "aocs_op_mode",
+            "_pointing_errors",
+        ],
+        "formats": [">f4"] * 7 + [">u8", "u1", "u1"],
+        "offsets": [0, 4, 8, 12, 16, 20, 24, 28, 36, 37],
+        "itemsize": AttitudeAncillaryData._BPACK_SIZE_BYTES,
+    }
+)
+
+_TIME_STAMP_MASK = np.uint64(2**56 - 1)
+
+
+def _records_to_arrays(buf, dtype: np.dtype) -> Dict[str, np.ndarray]:
+    records = np.frombuffer(buf, dtype=dtype)
+    arrays = {
+        name: records[name].astype(records.dtype[name].newbyteorder("="))
+        for name in dtype.names
+        if not name.startswith("_")
+    }
+    arrays["time_stamp"] = records["_time_stamp"] & _TIME_STAMP_MASK
+    return arrays
+
+
+def decode_pvt(buf) -> Dict[str, np.ndarray]:
+    """Decode many PVT records at once.
+
+    :param buf:
+        bytes-like object containing the raw (concatenated)
+        :class:`s1isp.descriptors.PVTAncillaryData` records
+    :returns:
+        a dictionary mapping field names to arrays with one item per
+        record (see :func:`record_from_arrays`)
+    """
+    return _records_to_arrays(buf, PVT_DTYPE)
+
+
+def decode_attitude(buf) -> Dict[str, np.ndarray]:
+    """Decode many Attitude records at once.
+
+    :param buf:
+        bytes-like object containing the raw (concatenated)
+        :class:`s1isp.descriptors.AttitudeAncillaryData` records
+    :returns:
+        a dictionary mapping field names (including the ones of the
+        nested :class:`s1isp.descriptors.PointingStatus`) to arrays with
+        one item per record (see :func:`record_from_arrays`)
+    """
+    arrays = _records_to_arrays(buf, ATT_DTYPE)
+    errors = np.frombuffer(buf, dtype=ATT_DTYPE)["_pointing_errors"]
+    arrays["roll_error"] = (errors & 0b100) != 0
+    arrays["pitch_error"] = (errors & 0b010) != 0
+    arrays["yaw_error"] = (errors & 0b001) != 0
+    return arrays
+
+
+# === HK Temperature Ancillary Data ===
+# Raw (big endian) layout of HK records (S1-IF-ASD-PL-0007, table 3.2-9).
+# The (EFE H, EFE V, TA) temperatures of the 14 tiles are a contiguous
+# block of bytes, and the 7 bits TGU temperature is in the last byte.
+HK_DTYPE = np.dtype(
+    {
+        "names": ["temperature_update_status", "tile_temperatures", "_tgu"],
+        "formats": [">u2", ("u1", (_HK_NTILES, 3)), "u1"],
+        "offsets": [0, 2, 45],
+        "itemsize": HKTemperatureAncillaryData._BPACK_SIZE_BYTES,
+    }
+)
+
+
+def decode_hk(buf) -> Dict[str, np.ndarray]:
+    """Decode many HK temperature records at once.
+
+    :param buf:
+        bytes-like object containing the raw (concatenated)
+        :class:`s1isp.descriptors.HKTemperatureAncillaryData` records
+    :returns:
+        a dictionary mapping field names to arrays with one item per
+        record (see :func:`record_from_arrays`).
+        The additional "tile_temperatures" item is the (N, 14, 3) array
+        of tile temperatures (the per-tile fields are views of it).
+    """
+    records = np.frombuffer(buf, dtype=HK_DTYPE)
+    tiles = records["tile_temperatures"].copy()
+    arrays = {
+        "temperature_update_status": records[
+            "temperature_update_status"
+        ].astype(np.uint16),
+        "tile_temperatures": tiles,
+        "tgu_temperature": records["_tgu"] & np.uint8(0x7F),
+    }
+    flat_tiles = tiles.reshape(len(tiles), -1)
+    for idx, name in enumerate(_HK_TILE_TEMPERATURE_FIELDS):
+        arrays[name] = flat_tiles[:, idx]
+    return arrays
+
+
+def get_tile_temperatures(
+    records: Iterable[HKTemperatureAncillaryData],
+) -> np.ndarray:
+    """Return the tile temperatures of many HK records.
+
+    The returned array has shape (N, 14, 3) and contains the (14, 3)
+    arrays returned by the ``get_tile_temperatures`` method of each
+    :class:`s1isp.descriptors.HKTemperatureAncillaryData` record.
+    """
+    tiles = [record.get_tile_temperatures() for record in records]
+    if not tiles:
+        return np.empty((0, 14, 3), dtype=np.uint8)
+    return np.stack(tiles)
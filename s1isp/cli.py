@@ -49,6 +49,7 @@ def dump_records(
     enum_value: bool = False,
     force: bool = False,
     udf_decoding_mode: EUdfDecodingMode = EUdfDecodingMode.NONE,
+    nprocs: Optional[int] = None,
 ):
     """Dump content of primary and secondary headers into an XLSX file."""
     output_format = EOutputFormat(output_format)
@@ -70,6 +71,8 @@ def dump_records(
         maxcount=maxcount,
         bytes_offset=bytes_offset,
         udf_decoding_mode=udf_decoding_mode,
+        collect_subcomm=output_format == EOutputFormat.PICKLE,
+        nprocs=nprocs,
     )
     elapsed = datetime.datetime.now() - t0
     _log.info("Decoding complete (elapsed time %s).", elapsed)
@@ -235,6 +238,13 @@ def get_parser(subparsers=None) -> argparse.ArgumentParser:
         help="control the management of the user data field data "
         "(default: '%(default)s')",
     )
+    parser.add_argument(
+        "-j",
+        "--nprocs",
+        type=int,
+        help="number of processes used for decoding "
+        "(default: decode in the main process)",
+    )
 
     # Positional arguments
     parser.add_argument("filename", help="RAW data file name")
@@ -302,6 +312,7 @@ def main(*argv):
             enum_value=args.enum_value,
             force=args.force,
             udf_decoding_mode=args.data,
+            nprocs=args.nprocs,
         )
     except Exception as exc:  # noqa: BLE001
         _log.critical(
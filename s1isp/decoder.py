@@ -1,8 +1,13 @@
 """Sentinel-1 RAW data decoder."""
 
 import io
+import os
 import enum
+import math
+import mmap
 import logging
+import multiprocessing
+import concurrent.futures
 from typing import List, NamedTuple, Optional, Sequence, Tuple, Type, Union
 
 import tqdm
@@ -12,6 +17,7 @@ from .constants import SYNC_MARKER
 from .constants import PRIMARY_HEADER_SIZE as PHSIZE
 from .constants import SECONDARY_HEADER_SIZE as SHSIZE
 from .descriptors import (
+    PacketHeader,
     PVTAncillaryData,
     PrimaryHeader,
     SyncMarkerError,
@@ -23,17 +29,29 @@ from .descriptors import (
 
 __all__ = [
     "isp_to_dict",
+    "scan_stream",
     "decode_stream",
     "decoded_subcomm_to_dict",
     "decoded_stream_to_dict",
     "SubCommutatedDataDecoder",
+    "TruncatedISPError",
 ]
 
 
 SUB_COMM_LEN = 64
 
+
+class TruncatedISPError(EOFError):
+    """Truncated ISP at the end of the input file."""
+
+    pass
+
+
 _log = logging.getLogger(__name__)
 
+_decode_primary_header = PrimaryHeader._fast_decode
+_decode_packet_header = PacketHeader._fast_decode
+
 
 class DecodedDataItem(NamedTuple):
     primary_header: PrimaryHeader
@@ -54,7 +72,7 @@ class DecodedSubCommData(NamedTuple):
 
 class SubcomRecordInfo:
     def __init__(self, record_type: Type, word_index: int):
-        self.size: int = bpack.calcsize(record_type, bpack.EBaseUnits.BYTES)
+        self.size: int = record_type._BPACK_SIZE_BYTES
         self.record_type = record_type
         self.first_word_index: int = word_index
         self.last_word_index = self.first_word_index + self.size // 2 - 1
@@ -95,7 +113,7 @@ class CycleHandler:
                     item.data_word
                     for item in self.data[first_idx : last_idx + 1]
                 )
-                out.append(info.record_type.frombytes(data))
+                out.append(info.record_type._fast_decode(data))
 
         return DecodedSubCommData(*out)
 
@@ -216,12 +234,236 @@ class EUdfDecodingMode(enum.Enum):
         return self.value
 
 
+def _check_primary_header(primary_header: PrimaryHeader):
+    assert primary_header.packet_version_number == 0
+    assert primary_header.packet_type == 0
+    assert primary_header.sequence_flags == 3
+    # assert (
+    #    primary_header.packet_sequence_count == packet_counter % 2**14
+    # )
+    assert primary_header.secondary_header_flag
+
+
+def _check_secondary_header(
+    secondary_header: SecondaryHeader, packet_counter: int
+) -> int:
+    """Validate the secondary header.
+
+    Return the BAQ block size (even + odd).
+    """
+    # -- Datation Service
+    # ds = secondary_header.datation
+
+    # -- Fixed Ancillary Data Service
+    # fasd = secondary_header.fixed_ancillary_data
+    sync = secondary_header.fixed_ancillary_data.sync_marker
+    if sync != SYNC_MARKER:
+        raise SyncMarkerError(f"packet count: {packet_counter + 1}")
+
+    # -- Sub-commutation Ancillary Data Service
+    # sc_ads = secondary_header.subcom_ancillary_data
+
+    # -- Counters Service
+    # cs = secondary_header.counters
+    # The following assertion is incorrect for IW.
+    # We need a proper timeline checking mechanism.
+    # assert packet_counter == cs.space_packet_count
+
+    # -- Radar Configuration Support Service
+    rcss = secondary_header.radar_configuration_support
+    assert rcss.error_flag is False
+    # blocksize -> even + odd
+    blocksize = rcss.get_baq_block_len_samples() // 2
+    assert blocksize == 128, f"blocksize: {blocksize} != 128"
+
+    # -- Radar Sample Count Service
+    # rscs = secondary_header.radar_sample_count
+    # See S1-IF-ASD-PL-0007, section 3.2.5.11
+    # if rcss.ses.signal_type <= 7:
+    #     assert (
+    #         2 * rscs.number_of_quads == rcss.get_swl_n3rx_samples()
+    #     ), (
+    #         f"number_of_quads: {rscs.number_of_quads}, "
+    #         f"swl_n3rx_samples: {rcss.get_swl_n3rx_samples()}"
+    #     )
+
+    return blocksize
+
+
+def _decode_udf(
+    udfbytes: bytes, secondary_header: SecondaryHeader, blocksize: int
+):
+    from .udf import decode_ud
+
+    nq = secondary_header.radar_sample_count.number_of_quads
+    baqmod = secondary_header.radar_configuration_support.baq_mode
+    tstmod = secondary_header.fixed_ancillary_data.test_mode
+    return decode_ud(udfbytes, nq, baqmod, tstmod, blocksize=blocksize)
+
+
+def scan_stream(
+    filename,
+    skip: Optional[int] = None,
+    maxcount: Optional[int] = None,
+    bytes_offset: int = 0,
+) -> List[int]:
+    """Return the offsets of ISPs in the input file.
+
+    Only the primary headers are read, so the scan is much faster than
+    a full decoding.
+    The parameters have the same meaning of the corresponding ones in
+    :func:`decode_stream`, and the returned list is the same returned
+    by :func:`decode_stream`: it includes the offsets of the skipped
+    ISPs and, as last item, the offset of the first ISP not decoded
+    (or the file size).
+    Primary headers are validated as in :func:`decode_stream`.
+
+    :raises TruncatedISPError:
+        if an ISP to be scanned extends beyond the end of the file
+    """
+    nmax = None
+    if maxcount:
+        nmax = maxcount + (skip if skip else 0)
+
+    offsets: List[int] = []
+    with open(filename, "rb") as fd:
+        filesize = os.fstat(fd.fileno()).st_size
+        if bytes_offset:
+            assert bytes_offset >= 0
+            fd.seek(bytes_offset)
+
+        while True:
+            offset = fd.tell()
+            offsets.append(offset)
+            if nmax and len(offsets) > nmax:
+                break
+            data = fd.read(PHSIZE)
+            if len(data) == 0:
+                break
+            if len(data) < PHSIZE:
+                raise TruncatedISPError(f"truncated ISP at offset {offset}")
+            primary_header = _decode_primary_header(data)
+            _check_primary_header(primary_header)
+            data_field_size = primary_header.packet_data_length + 1
+            if offset + PHSIZE + data_field_size > filesize:
+                raise TruncatedISPError(f"truncated ISP at offset {offset}")
+            fd.seek(data_field_size, io.SEEK_CUR)
+
+    return offsets
+
+
+def _decode_chunk(
+    filename,
+    offsets: Sequence[int],
+    packet_counter: int,
+    udf_decoding_mode: EUdfDecodingMode,
+    collect_subcomm: bool,
+) -> Tuple[List[DecodedDataItem], List[SubCommItem]]:
+    """Decode the ISPs located at the specified offsets."""
+    records: List[DecodedDataItem] = []
+    subcom_data_records: List[SubCommItem] = []
+    with open(filename, "rb") as fd, mmap.mmap(
+        fd.fileno(), 0, access=mmap.ACCESS_READ
+    ) as buf:
+        for offset in offsets:
+            header = _decode_packet_header(buf, offset)
+            primary_header = header.primary_header
+            _check_primary_header(primary_header)
+            data_field_size = primary_header.packet_data_length + 1
+
+            secondary_header = header.secondary_header
+            blocksize = _check_secondary_header(
+                secondary_header, packet_counter
+            )
+            if collect_subcomm:
+                subcom_data_records.append(
+                    SubCommItem(
+                        packet_counter,
+                        secondary_header.subcom_ancillary_data,
+                    )
+                )
+
+            offset += PHSIZE + SHSIZE
+            udf_size = data_field_size - SHSIZE
+            if udf_decoding_mode is EUdfDecodingMode.NONE:
+                udf = None
+            elif udf_decoding_mode is EUdfDecodingMode.EXTRACT:
+                udf = buf[offset : offset + udf_size]
+            elif udf_decoding_mode is EUdfDecodingMode.DECODE:
+                udf = _decode_udf(
+                    buf[offset : offset + udf_size],
+                    secondary_header,
+                    blocksize,
+                )
+
+            records.append(
+                DecodedDataItem(primary_header, secondary_header, udf)
+            )
+            packet_counter += 1
+
+    return records, subcom_data_records
+
+
+def _decode_stream_parallel(
+    filename,
+    skip: Optional[int],
+    maxcount: Optional[int],
+    bytes_offset: int,
+    udf_decoding_mode: EUdfDecodingMode,
+    collect_subcomm: bool,
+    nprocs: int,
+) -> Tuple[List[DecodedDataItem], List[int], List[SubCommItem]]:
+    offsets = scan_stream(filename, skip, maxcount, bytes_offset)
+    skip = skip if skip else 0
+    isp_offsets = offsets[skip:-1]
+    if not isp_offsets:
+        return [], offsets, []
+
+    nchunks = 4 * nprocs
+    chunksize = max(1, math.ceil(len(isp_offsets) / nchunks))
+    chunks = [
+        (start, isp_offsets[start : start + chunksize])
+        for start in range(0, len(isp_offsets), chunksize)
+    ]
+
+    records: List[DecodedDataItem] = []
+    subcom_data_records: List[SubCommItem] = []
+    pbar = tqdm.tqdm(total=len(isp_offsets), unit=" packets", desc="decoded")
+    # NOTE: "spawn" is used because forking a multi-threaded process
+    #       (e.g. tqdm uses a monitor thread) is unsafe.
+    mp_context = multiprocessing.get_context("spawn")
+    executor = concurrent.futures.ProcessPoolExecutor(
+        max_workers=nprocs, mp_context=mp_context
+    )
+    with executor, pbar:
+        futures = [
+            executor.submit(
+                _decode_chunk,
+                filename,
+                chunk_offsets,
+                skip + start,
+                udf_decoding_mode,
+                collect_subcomm,
+            )
+            for start, chunk_offsets in chunks
+        ]
+        for future in futures:
+            chunk_records, chunk_subcom_data_records = future.result()
+            records.extend(chunk_records)
+            subcom_data_records.extend(chunk_subcom_data_records)
+            pbar.update(len(chunk_records))
+
+    return records, offsets, subcom_data_records
+
+
 def decode_stream(
     filename,
     skip: Optional[int] = None,
     maxcount: Optional[int] = None,
     bytes_offset: int = 0,
     udf_decoding_mode: EUdfDecodingMode = EUdfDecodingMode.NONE,
+    collect_subcomm: bool = True,
+    nprocs: Optional[int] = None,
 ) -> Tuple[List[DecodedDataItem], List[int], List[SubCommItem]]:
     """Decode packet headers.
 
@@ -238,16 +480,36 @@ def decode_stream(
         first ISP (if the `skip` parameter is specified the count starts
         at this offset).
         Default: 0.
+    :param collect_subcomm: bool, optional
+        if set to False the sub-commutated ancillary data are not
+        collected and an empty list is returned in their place.
+        Default: True.
+    :param nprocs: int, optional
+        number of worker processes used for decoding.
+        If larger than 1, ISP offsets are computed in a fast preliminary
+        scan of the file (see :func:`scan_stream`) and chunks of ISPs are
+        decoded in parallel.
+        Default: decode sequentially in the current process.
     :returns:
-        a 2 items tuple containing:
+        a 3 items tuple containing:
 
         * the decoded ISPs in form of (nested) dataclass structures
+        * the list of offsets (in bytes) of the decoded ISPs
         * a list of :class:`SubCommItem` s containing sub-commutated data
+    :raises TruncatedISPError:
+        if an ISP to be decoded (or skipped) extends beyond the end of
+        the file
     """
-    if udf_decoding_mode is EUdfDecodingMode.DECODE:
-        from .udf import decode_ud
-    else:
-        decode_ud = None
+    if nprocs is not None and nprocs > 1:
+        return _decode_stream_parallel(
+            filename,
+            skip,
+            maxcount,
+            bytes_offset,
+            udf_decoding_mode,
+            collect_subcomm,
+            nprocs,
+        )
 
     packet_counter: int = 0
     records: List[DecodedDataItem] = []
@@ -255,6 +517,7 @@ def decode_stream(
     offsets: List[int] = []
     pbar = tqdm.tqdm(unit=" packets", desc="decoded")
     with open(filename, "rb") as fd, pbar:
+        filesize = os.fstat(fd.fileno()).st_size
         if bytes_offset:
             assert bytes_offset >= 0
             fd.seek(bytes_offset)
@@ -263,77 +526,50 @@ def decode_stream(
             # TODO: it would be probably faster to use a local variable
             offsets.append(fd.tell())
 
-            # primary header
-            data = fd.read(PHSIZE)
+            # primary and secondary header
+            data = fd.read(PHSIZE + SHSIZE)
             if len(data) == 0 or (maxcount and len(records) >= maxcount):
                 break
-
-            # type - PrimaryHeader
-            primary_header = PrimaryHeader.frombytes(data)
-
-            assert primary_header.packet_version_number == 0
-            assert primary_header.packet_type == 0
-            assert primary_header.sequence_flags == 3
-            # assert (
-            #    primary_header.packet_sequence_count == packet_counter % 2**14
-            # )
-
-            # secondary header
-            assert primary_header.secondary_header_flag
-            data_field_size = primary_header.packet_data_length + 1
+            if len(data) < PHSIZE + SHSIZE:
+                raise TruncatedISPError(
+                    f"truncated ISP at offset {offsets[-1]}"
+                )
 
             if skip and packet_counter < skip:
+                # type - PrimaryHeader
+                primary_header = _decode_primary_header(data)
+                _check_primary_header(primary_header)
+                data_field_size = primary_header.packet_data_length + 1
+                if offsets[-1] + PHSIZE + data_field_size > filesize:
+                    raise TruncatedISPError(
+                        f"truncated ISP at offset {offsets[-1]}"
+                    )
                 packet_counter += 1
-                fd.seek(data_field_size, io.SEEK_CUR)
+                fd.seek(data_field_size - SHSIZE, io.SEEK_CUR)
                 continue
 
-            # data = fd.read(data_field_size)
-            # assert data_field_size == len(data)
-            data = fd.read(SHSIZE)
-
-            # type - SecondaryHeader
-            secondary_header = SecondaryHeader.frombytes(data[:SHSIZE])
+            # type - PacketHeader
+            header = _decode_packet_header(data)
 
-            # -- Datation Service
-            # ds = secondary_header.datation
-
-            # -- Fixed Ancillary Data Service
-            # fasd = secondary_header.fixed_ancillary_data
-            sync = secondary_header.fixed_ancillary_data.sync_marker
-            if sync != SYNC_MARKER:
-                raise SyncMarkerError(f"packet count: {packet_counter + 1}")
+            primary_header = header.primary_header
+            _check_primary_header(primary_header)
+            data_field_size = primary_header.packet_data_length + 1
+            if offsets[-1] + PHSIZE + data_field_size > filesize:
+                raise TruncatedISPError(
+                    f"truncated ISP at offset {offsets[-1]}"
+                )
 
-            # -- Sub-commutation Ancillary Data Service
-            # sc_ads = secondary_header.subcom_ancillary_data
-            sc_data_item = SubCommItem(
-                packet_counter,
-                secondary_header.subcom_ancillary_data,
+            secondary_header = header.secondary_header
+            blocksize = _check_secondary_header(
+                secondary_header, packet_counter
             )
-            subcom_data_records.append(sc_data_item)
-
-            # -- Counters Service
-            # cs = secondary_header.counters
-            # The following assertion is incorrect for IW.
-            # We need a proper timeline checking mechanism.
-            # assert packet_counter == cs.space_packet_count
-
-            # -- Radar Configuration Support Service
-            rcss = secondary_header.radar_configuration_support
-            assert rcss.error_flag is False
-            # blocksize -> even + odd
-            blocksize = rcss.get_baq_block_len_samples() // 2
-            assert blocksize == 128, f"blocksize: {blocksize} != 128"
-
-            # -- Radar Sample Count Service
-            rscs = secondary_header.radar_sample_count
-            # See S1-IF-ASD-PL-0007, section 3.2.5.11
-            # if rcss.ses.signal_type <= 7:
-            #     assert (
-            #         2 * rscs.number_of_quads == rcss.get_swl_n3rx_samples()
-            #     ), (
-            #         f"number_of_quads: {rscs.number_of_quads}, "
-            #         f"swl_n3rx_samples: {rcss.get_swl_n3rx_samples()}"
-            #     )
+
+            if collect_subcomm:
+                sc_data_item = SubCommItem(
+                    packet_counter,
+                    secondary_header.subcom_ancillary_data,
+                )
+                subcom_data_records.append(sc_data_item)
 
             # -- user data
             if udf_decoding_mode is EUdfDecodingMode.NONE:
@@ -343,12 +579,7 @@ def decode_stream(
                 udf = fd.read(data_field_size - SHSIZE)
             elif udf_decoding_mode is EUdfDecodingMode.DECODE:
                 udfbytes = fd.read(data_field_size - SHSIZE)
-                nq = rscs.number_of_quads
-                baqmod = rcss.baq_mode
-                tstmod = secondary_header.fixed_ancillary_data.test_mode
-                udf = decode_ud(
-                    udfbytes, nq, baqmod, tstmod, blocksize=blocksize
-                )
+                udf = _decode_udf(udfbytes, secondary_header, blocksize)
 
             assert offsets[-1] + PHSIZE + data_field_size == fd.tell()
 
@@ -4,8 +4,8 @@ The definition of all the ISP records is provided in the "Sentinel-1 SAR
 Space Packet Protocol Data Unit" document (S1-IF-ASD-PL-0007) issue 13.
 """
 
-import math
-from typing import Union
+import sys
+from typing import Union, NamedTuple
 
 import bpack
 import bpack.bs
@@ -31,6 +31,7 @@ from .enums import (
     ERangeDecimation,
     ETemperatureCompensation,
 )
+from ._codegen import make_decoder
 from .constants import REF_FREQ, SYNC_MARKER
 from .constants import PRIMARY_HEADER_SIZE as PHSIZE
 from .constants import SECONDARY_HEADER_SIZE as SHSIZE
@@ -38,6 +39,52 @@ from .constants import SECONDARY_HEADER_SIZE as SHSIZE
 BITS = bpack.EBaseUnits.BITS
 BE = bpack.EByteOrder.BE
 
+# Scale factors for the conversion of RCSS fields into physical units
+# (S1-IF-ASD-PL-0007, section 3.2.5)
+_TX_RAMP_RATE_SCALE = REF_FREQ**2 / 2**21  # [MHz/us]
+_TX_PULSE_START_FREQ_SCALE = REF_FREQ / 2**14  # [MHz]
+_REF_PERIOD_SEC = 1e-6 / REF_FREQ  # [s]
+_DELTA_T_SUPPR_SEC = 320 / 8 * _REF_PERIOD_SEC  # [s]
+_FINE_TIME_SCALE = 2.0**-16  # [s]
+
+
+# Descriptors use __slots__ (if supported by dataclasses, Python >= 3.10)
+# to reduce the memory footprint of decoded records and speed up the
+# attribute access.
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+class _BaseRecord:
+    """Base class for ISP records.
+
+    It provides fast decoding from buffers and allows to unpickle
+    records pickled before the introduction of __slots__, i.e. with the
+    state stored in the instance __dict__.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def unpack_from(cls, buffer, offset: int = 0):
+        """Decode a record from `buffer` starting at `offset` (in bytes).
+
+        The buffer can be any bytes-like object, e.g. a memoryview or a
+        memory mapped file, and no copy of the data is performed.
+
+        It is equivalent to ``cls.frombytes(buffer[offset:offset+size])``
+        but much faster, since it uses a specialized decoder generated
+        at import time.
+        """
+        return cls._fast_decode(buffer, offset)
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple):
+            # (dict state, slots state)
+            dict_state, slots_state = state
+            state = dict(dict_state or {}, **(slots_state or {}))
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
 
 class SyncMarkerError(RuntimeError):
     """Sync marker error."""
@@ -46,8 +93,8 @@ class SyncMarkerError(RuntimeError):
 
 
 @bpack.bs.decoder
-@bpack.descriptor(baseunits=BITS, byteorder=BE)
-class PrimaryHeader:
+@bpack.descriptor(baseunits=BITS, byteorder=BE, **_SLOTS)
+class PrimaryHeader(_BaseRecord):
     """Primary packet header (S1-IF-ASD-PL-0007, section 3.1)."""
 
     packet_version_number: T["u3"] = 0
@@ -60,12 +107,9 @@ class PrimaryHeader:
     packet_data_length: T["u16"] = 0
 
 
-assert bpack.calcsize(PrimaryHeader, bpack.EBaseUnits.BYTES) == PHSIZE
-
-
 @bpack.bs.decoder
-@bpack.descriptor(baseunits=BITS, byteorder=BE)
-class DatationService:
+@bpack.descriptor(baseunits=BITS, byteorder=BE, **_SLOTS)
+class DatationService(_BaseRecord):
     """Datation Service (S1-IF-ASD-PL-0007, section 3.2.1)."""
 
     coarse_time: T["u32"] = 0
@@ -76,12 +120,12 @@ class DatationService:
 
         The Fine Time represents the sub-second time stamp of the Space Packet.
         """
-        return (self.fine_time + 0.5) * 2.0**-16
+        return (self.fine_time + 0.5) * _FINE_TIME_SCALE
 
 
 @bpack.bs.decoder
-@bpack.descriptor(baseunits=BITS, byteorder=BE)
-class FixedAncillaryDataService:
+@bpack.descriptor(baseunits=BITS, byteorder=BE, **_SLOTS)
+class FixedAncillaryDataService(_BaseRecord):
     """Fixed Ancillary Data Field (S1-IF-ASD-PL-0007, section 3.2.2)."""
 
     sync_marker: T["u32"] = SYNC_MARKER
@@ -96,8 +140,8 @@ class FixedAncillaryDataService:
 
 
 @bpack.bs.decoder
-@bpack.descriptor(baseunits=BITS, byteorder=BE)
-class SubCommutatedAncillaryDataService:
+@bpack.descriptor(baseunits=BITS, byteorder=BE, **_SLOTS)
+class SubCommutatedAncillaryDataService(_BaseRecord):
     """Sub-commutated Ancillary Data Service.
 
     See S1-IF-ASD-PL-0007, section 3.2.3 and table 3.2.-12
@@ -108,8 +152,8 @@ class SubCommutatedAncillaryDataService:
 
 
 @bpack.bs.decoder
-@bpack.descriptor(baseunits=BITS, byteorder=BE)
-class PVTAncillaryData:
+@bpack.descriptor(baseunits=BITS, byteorder=BE, **_SLOTS)
+class PVTAncillaryData(_BaseRecord):
     """Position Velocity Time (PVT) Ancillary Data.
 
     See S1-IF-ASD-PL-0007, table 3.2-5.
@@ -126,8 +170,8 @@ class PVTAncillaryData:
 
 
 @bpack.bs.decoder
-@bpack.descriptor(baseunits=BITS, byteorder=BE)
-class PointingStatus:
+@bpack.descriptor(baseunits=BITS, byteorder=BE, **_SLOTS)
+class PointingStatus(_BaseRecord):
     """Pointing Status (S1-IF-ASD-PL-0007, table 3.2-8)."""
 
     aocs_op_mode: T["u8"] = EAocsOpMode.NO_MODE
@@ -137,8 +181,8 @@ class PointingStatus:
 
 
 @bpack.bs.decoder
-@bpack.descriptor(baseunits=BITS, byteorder=BE)
-class AttitudeAncillaryData:
+@bpack.descriptor(baseunits=BITS, byteorder=BE, **_SLOTS)
+class AttitudeAncillaryData(_BaseRecord):
     """Attitude Ancillary Data (S1-IF-ASD-PL-0007, table 3.2-6)."""
 
     q0: T["f32"] = 0
@@ -156,8 +200,8 @@ class AttitudeAncillaryData:
 
 
 @bpack.bs.decoder
-@bpack.descriptor(baseunits=BITS, byteorder=BE)
-class HKTemperatureAncillaryData:
+@bpack.descriptor(baseunits=BITS, byteorder=BE, **_SLOTS)
+class HKTemperatureAncillaryData(_BaseRecord):
     """Antenna and TGU temperature HouseKeeping Data.
 
     See S1-IF-ASD-PL-0007, table 3.2-9.
@@ -223,10 +267,33 @@ class HKTemperatureAncillaryData:
 
     tgu_temperature: T["u7"] = bpack.field(default=0, offset=361)
 
+    def get_tile_temperatures(self):
+        """Return the tile temperatures as a (14, 3) array of uint8.
+
+        Rows correspond to tiles (from 1 to 14), columns to the EFE H,
+        EFE V and TA temperatures respectively.
+        """
+        import numpy as np
+
+        data = [getattr(self, name) for name in _HK_TILE_TEMPERATURE_FIELDS]
+        return np.array(data, dtype=np.uint8).reshape(_HK_NTILES, 3)
+
+
+_HK_NTILES = 14
+_HK_TILE_TEMPERATURE_FIELDS = tuple(
+    f"tile{tile}_{item}_temperature"
+    for tile in range(1, _HK_NTILES + 1)
+    for item in ("efeh", "efev", "ta")
+)
+assert all(
+    name in HKTemperatureAncillaryData.__dataclass_fields__
+    for name in _HK_TILE_TEMPERATURE_FIELDS
+)
+
 
 @bpack.bs.decoder
-@bpack.descriptor(baseunits=BITS, byteorder=BE)
-class CountersService:
+@bpack.descriptor(baseunits=BITS, byteorder=BE, **_SLOTS)
+class CountersService(_BaseRecord):
     """Counters Service (S1-IF-ASD-PL-0007, section 3.2.4)."""
 
     space_packet_count: T["u32"] = 0
@@ -234,8 +301,8 @@ class CountersService:
 
 
 @bpack.bs.decoder
-@bpack.descriptor(baseunits=BITS, byteorder=BE)
-class SasImgData:
+@bpack.descriptor(baseunits=BITS, byteorder=BE, **_SLOTS)
+class SasImgData(_BaseRecord):
     """SAS SSB Data (S1-IF-ASD-PL-0007, section 3.2.5.13.1).
 
     The SAS SSB Data field indicates the actual configuration of the
@@ -254,8 +321,8 @@ class SasImgData:
 
 
 @bpack.bs.decoder
-@bpack.descriptor(baseunits=BITS, byteorder=BE)
-class SasCalData:
+@bpack.descriptor(baseunits=BITS, byteorder=BE, **_SLOTS)
+class SasCalData(_BaseRecord):
     """SAS SSB Data (S1-IF-ASD-PL-0007, section 3.2.5.13.2).
 
     The SAS SSB Data field indicates the actual configuration of the
@@ -274,9 +341,38 @@ class SasCalData:
     calibration_beam_address: T["u10"] = bpack.field(default=0, offset=14)
 
 
+class SasImgDataRaw(NamedTuple):
+    """Plain integer counterpart of :class:`SasImgData`."""
+
+    ssb_flag: int
+    polarization: int
+    temperature_compensation: int
+    elevation_beam_address: int
+    azimuth_beam_address: int
+
+
+class SasCalDataRaw(NamedTuple):
+    """Plain integer counterpart of :class:`SasCalData`."""
+
+    ssb_flag: int
+    polarization: int
+    temperature_compensation: int
+    sas_test: int
+    cal_type: int
+    calibration_beam_address: int
+
+
+# SAS SSB dynamic data layout (S1-IF-ASD-PL-0007, section 3.2.5.13.2)
+_SAS_TEST_SHIFT = 3
+_SAS_TEST_MASK = 0b0000001
+_CAL_TYPE_MASK = 0b00000111
+_SAS_TEST_TABLE = tuple(ESasTestMode(v) for v in range(_SAS_TEST_MASK + 1))
+_CAL_TYPE_TABLE = tuple(ECalType(v) for v in range(_CAL_TYPE_MASK + 1))
+
+
 @bpack.bs.decoder
-@bpack.descriptor(baseunits=BITS, byteorder=BE)
-class SasData:
+@bpack.descriptor(baseunits=BITS, byteorder=BE, **_SLOTS)
+class SasData(_BaseRecord):
     """SAS SSB Data (S1-IF-ASD-PL-0007, section 3.2.5.13).
 
     The SAS SSB Data field indicates the actual configuration of the
@@ -304,17 +400,45 @@ class SasData:
                 self.ssb_flag,
                 self.polarization,
                 self.temperature_compensation,
-                self.get_elevation_beam_address(),
-                self.get_azimuth_beam_address(),
+                self._dynamic_data,
+                self._beam_address,
             )
         else:
             return SasCalData(
                 self.ssb_flag,
                 self.polarization,
                 self.temperature_compensation,
-                self.get_sas_test(),
-                self.get_cal_type(),
-                self.get_calibration_beam_address(),
+                self._get_sas_test_nocheck(),
+                self._get_cal_type_nocheck(),
+                self._beam_address,
+            )
+
+    def get_sas_data_raw(self) -> Union[SasImgDataRaw, SasCalDataRaw]:
+        """Return the SAS data fields as a named tuple of plain integers.
+
+        This is the counterpart of :meth:`get_sas_data` without enum
+        wrapping and without the construction of a new record.
+        If the `ssb_flag` is False a :class:`SasImgDataRaw` is returned,
+        otherwise a :class:`SasCalDataRaw`; fields have the same names
+        and order of the ones of :class:`SasImgData` and
+        :class:`SasCalData` respectively.
+        """
+        if not self.ssb_flag:
+            return SasImgDataRaw(
+                0,
+                int(self.polarization),
+                int(self.temperature_compensation),
+                self._dynamic_data,
+                self._beam_address,
+            )
+        else:
+            return SasCalDataRaw(
+                1,
+                int(self.polarization),
+                int(self.temperature_compensation),
+                (self._dynamic_data >> _SAS_TEST_SHIFT) & _SAS_TEST_MASK,
+                self._dynamic_data & _CAL_TYPE_MASK,
+                self._beam_address,
             )
 
     def get_elevation_beam_address(self, check: bool = True) -> int:
@@ -356,7 +480,12 @@ class SasData:
                 "SAS SSB Data with ssb_flag=False have no sas_test field"
             )
 
-        return ESasTestMode((self._dynamic_data >> 3) & 0b0000001)
+        return self._get_sas_test_nocheck()
+
+    def _get_sas_test_nocheck(self) -> ESasTestMode:
+        return _SAS_TEST_TABLE[
+            (self._dynamic_data >> _SAS_TEST_SHIFT) & _SAS_TEST_MASK
+        ]
 
     def get_cal_type(self, check: bool = True) -> ECalType:
         """Return the calibration type code.
@@ -369,7 +498,10 @@ class SasData:
                 "SAS SSB Data with ssb_flag=False have no cal_type field"
             )
 
-        return ECalType(self._dynamic_data & 0b00000111)
+        return self._get_cal_type_nocheck()
+
+    def _get_cal_type_nocheck(self) -> ECalType:
+        return _CAL_TYPE_TABLE[self._dynamic_data & _CAL_TYPE_MASK]
 
     def get_calibration_beam_address(self, check: bool = True) -> int:
         """Return the calibration beam address code.
@@ -387,8 +519,8 @@ class SasData:
 
 
 @bpack.bs.decoder
-@bpack.descriptor(baseunits=BITS, byteorder=BE)
-class SesData:
+@bpack.descriptor(baseunits=BITS, byteorder=BE, **_SLOTS)
+class SesData(_BaseRecord):
     """SES SBB Data (S1-IF-ASD-PL-0007, section 3.2.5.14)."""
 
     cal_mode: ECalMode = bpack.field(size=2, default=0)
@@ -398,9 +530,24 @@ class SesData:
     swath_number: T["u8"] = 0
 
 
+def _make_range_decimation_params():
+    params = {}
+    for rdcode in ERangeDecimation:
+        rdinfo = lookup_range_decimation_info(rdcode)
+        filter_output_offset = lookup_filter_output_offset(rdcode)
+        num = rdinfo.decimation_ratio.numerator
+        den = rdinfo.decimation_ratio.denominator
+        params[rdcode] = (rdinfo, filter_output_offset, num, den)
+    return params
+
+
+# (range decimation info, filter output offset, num, den) per code
+_RANGE_DECIMATION_PARAMS = _make_range_decimation_params()
+
+
 @bpack.bs.decoder
-@bpack.descriptor(baseunits=BITS, byteorder=BE)
-class RadarConfigurationSupportService:
+@bpack.descriptor(baseunits=BITS, byteorder=BE, **_SLOTS)
+class RadarConfigurationSupportService(_BaseRecord):
     """Radar Configuration Support Service.
 
     See S1-IF-ASD-PL-0007, section 3.2.5.
@@ -437,7 +584,7 @@ class RadarConfigurationSupportService:
 
     def get_range_decimation_info(self) -> RangeDecimationInfo:
         """Return information associated to Range Decimation."""
-        return lookup_range_decimation_info(self.range_decimation)
+        return _RANGE_DECIMATION_PARAMS[self.range_decimation][0]
 
     def get_rx_gain_db(self) -> float:
         """Rx Gain in dB (S1-IF-ASD-PL-0007, section 3.2.5.5)."""
@@ -445,10 +592,11 @@ class RadarConfigurationSupportService:
 
     def _get_tx_ramp_rate_mhz_per_usec(self) -> float:
         """Tx Pulse Ramp Rate [Hz/s] (S1-IF-ASD-PL-0007, section 3.2.5.6)."""
-        sign = 1 if self.tx_ramp_rate >> 15 else -1
+        # sign/magnitude: sign bit set -> positive (branchless +1/-1)
+        sign = ((self.tx_ramp_rate >> 14) & 0b10) - 1
         value = self.tx_ramp_rate & 0b0111111111111111
 
-        return sign * (value * REF_FREQ**2 / 2**21)
+        return sign * value * _TX_RAMP_RATE_SCALE
 
     def get_tx_ramp_rate_hz_per_sec(self) -> float:
         """Tx Pulse Ramp Rate [Hz/s] (S1-IF-ASD-PL-0007, section 3.2.5.6)."""
@@ -459,16 +607,17 @@ class RadarConfigurationSupportService:
 
         See S1-IF-ASD-PL-0007, section 3.2.5.7).
         """
-        sign = 1 if self.tx_pulse_start_freq >> 15 else -1
+        # sign/magnitude: sign bit set -> positive (branchless +1/-1)
+        sign = ((self.tx_pulse_start_freq >> 14) & 0b10) - 1
         value = self.tx_pulse_start_freq & 0b0111111111111111
         return 1e6 * (
             self._get_tx_ramp_rate_mhz_per_usec() / (4 * REF_FREQ)
-            + sign * value * REF_FREQ / 2**14
+            + sign * value * _TX_PULSE_START_FREQ_SCALE
         )
 
     def get_tx_pulse_length_sec(self) -> float:
         """Tx Pulse Length [s] (S1-IF-ASD-PL-0007, section 3.2.5.8)."""
-        return self.tx_pulse_length / REF_FREQ * 1e-6
+        return self.tx_pulse_length * _REF_PERIOD_SEC
 
     def get_tx_pulse_length_samples(self) -> int:
         """Tx Pulse Length in samples in the space packet (N3_Tx).
@@ -478,44 +627,46 @@ class RadarConfigurationSupportService:
 
         See S1-IF-ASD-PL-0007, section 3.2.5.8.
         """
-        rdinfo = self.get_range_decimation_info()
-        f_dec = rdinfo.sampling_frequency
-        return math.ceil(self.get_tx_pulse_length_sec() * f_dec)
+        # N3_Tx = ceil(TXPL / f_ref * f_dec) with f_dec = 4 * f_ref * num / den
+        # the reference frequency cancels out, hence the exact computation
+        # with integer arithmetic
+        _, _, num, den = _RANGE_DECIMATION_PARAMS[self.range_decimation]
+        return -(-self.tx_pulse_length * 4 * num // den)
 
     def get_pri_sec(self) -> float:
         """Pulse Repetition Interval [s].
 
         See S1-IF-ASD-PL-0007, section 3.2.5.10.
         """
-        return self.pri / REF_FREQ * 1e-6
+        return self.pri * _REF_PERIOD_SEC
 
     def get_swst_sec(self) -> float:
         """Return the Sampling Window Start Time [s].
 
         See S1-IF-ASD-PL-0007, section 3.2.5.11.
         """
-        return self.swst / REF_FREQ * 1e-6
+        return self.swst * _REF_PERIOD_SEC
 
     def get_delta_t_suppr_sec(self) -> float:
         """Duration of the transient of the decimation filter [s].
 
         See (S1-IF-ASD-PL-0007, section 3.2.5.11).
         """
-        return 320 / 8 / REF_FREQ * 1e-6
+        return _DELTA_T_SUPPR_SEC
 
     def get_swst_after_decimation_sec(self) -> float:
         """Return the Sampling Window Start Time [s].
 
         See S1-IF-ASD-PL-0007, section 3.2.5.11.
         """
-        return (self.swst + 320 / 8) / REF_FREQ * 1e-6
+        return (self.swst + 320 / 8) * _REF_PERIOD_SEC
 
     def get_swl_sec(self) -> float:
         """Return the Sampling Window Length [s].
 
         See (S1-IF-ASD-PL-0007, section 3.2.5.12).
         """
-        return self.swl / REF_FREQ * 1e-6
+        return self.swl * _REF_PERIOD_SEC
 
     def get_swl_n3rx_samples(self) -> int:
         """Return the sampling Window Length in samples after the decimation.
@@ -525,18 +676,13 @@ class RadarConfigurationSupportService:
         See S1-IF-ASD-PL-0007, section 3.2.5.12.
         """
         rdcode = self.range_decimation
-        rdinfo = self.get_range_decimation_info()
-        num = rdinfo.decimation_ratio.numerator
-        den = rdinfo.decimation_ratio.denominator
-        nf = rdinfo.filter_length
-        filter_output_offset = 80 + nf // 4
-        assert filter_output_offset == lookup_filter_output_offset(rdcode)
+        _, filter_output_offset, num, den = _RANGE_DECIMATION_PARAMS[rdcode]
         b = 2 * self.swl - filter_output_offset - 17
         # WARNING: not sure if it is a truncation or a rounding
-        c = b - den * int(b / den)
+        q = int(b / den)  # truncation (towards zero also for b < 0)
+        c = b - den * q
         d = lookup_d_value(rdcode, c)
-        # WARNING: not sure if it is a truncation or a rounding
-        return 2 * (num * int(b / den) + d + 1)
+        return 2 * (num * q + d + 1)
 
     def get_swl_n3rx_sec(self) -> int:
         """Return the sampling Window Length in seconds after the decimation.
@@ -548,8 +694,8 @@ class RadarConfigurationSupportService:
 
 
 @bpack.bs.decoder
-@bpack.descriptor(baseunits=BITS, byteorder=BE, size=24)
-class RadarSampleCountService:
+@bpack.descriptor(baseunits=BITS, byteorder=BE, size=24, **_SLOTS)
+class RadarSampleCountService(_BaseRecord):
     """Radar Sample Count Service (S1-IF-ASD-PL-0007, section 3.2.6)."""
 
     number_of_quads: T["u16"] = 0
@@ -557,8 +703,8 @@ class RadarSampleCountService:
 
 
 @bpack.bs.decoder
-@bpack.descriptor(baseunits=BITS, byteorder=BE)
-class SecondaryHeader:
+@bpack.descriptor(baseunits=BITS, byteorder=BE, **_SLOTS)
+class SecondaryHeader(_BaseRecord):
     """Packet Secondary Header (S1-IF-ASD-PL-0007, section 3.2)."""
 
     datation: DatationService
@@ -569,4 +715,45 @@ class SecondaryHeader:
     radar_sample_count: RadarSampleCountService
 
 
-assert bpack.calcsize(SecondaryHeader, bpack.EBaseUnits.BYTES) == SHSIZE
+@bpack.bs.decoder
+@bpack.descriptor(baseunits=BITS, byteorder=BE, **_SLOTS)
+class PacketHeader(_BaseRecord):
+    """Packet header, i.e. the primary and secondary headers together.
+
+    It allows to decode both the headers with a single pass on the data.
+    """
+
+    primary_header: PrimaryHeader
+    secondary_header: SecondaryHeader
+
+
+# Cache the size in bytes of descriptors and attach specialized decoders,
+# generated once at import time, with signature: (data, offset=0)
+for _descriptor in (
+    PrimaryHeader,
+    DatationService,
+    FixedAncillaryDataService,
+    SubCommutatedAncillaryDataService,
+    PVTAncillaryData,
+    PointingStatus,
+    AttitudeAncillaryData,
+    HKTemperatureAncillaryData,
+    CountersService,
+    SasImgData,
+    SasCalData,
+    SasData,
+    SesData,
+    RadarConfigurationSupportService,
+    RadarSampleCountService,
+    SecondaryHeader,
+    PacketHeader,
+):
+    _descriptor._BPACK_SIZE_BYTES = bpack.calcsize(
+        _descriptor, bpack.EBaseUnits.BYTES
+    )
+    _descriptor._fast_decode = staticmethod(make_decoder(_descriptor))
+del _descriptor
+
+assert PrimaryHeader._BPACK_SIZE_BYTES == PHSIZE
+assert SecondaryHeader._BPACK_SIZE_BYTES == SHSIZE
+assert PacketHeader._BPACK_SIZE_BYTES == PHSIZE + SHSIZE
@@ -7,7 +7,7 @@ document (S1-IF-ASD-PL-0007) issue 13.
 import dataclasses
 from typing import List
 from fractions import Fraction
-from functools import lru_cache
+from functools import lru_cache, cached_property
 
 from .enums import EBaqMode, EBrcCode
 from .constants import REF_FREQ
@@ -22,9 +22,10 @@ class RangeDecimationInfo:
     filter_length: int  # samples
     swaths: List[str]
 
-    @property
+    @cached_property
     def sampling_frequency(self) -> float:
         """Return the sampling frequency in Hz."""
+        # cached: the arithmetic on Fraction objects is rather slow
         return self.decimation_ratio * 4 * REF_FREQ * 1e6
 
 
@@ -946,7 +947,8 @@ def get_baq_lut(baqmode: EBaqMode, thidx: int, dtype="float32"):
     lut = np.empty(2**nbits, dtype=np.float64)
     n = 2 ** (nbits - 1)
 
-    if thidx < n:
+    m = len(SRM_LUT_A[baqmode]) - 1
+    if thidx <= m:
         lut[: n - 1] = np.arange(n - 1, dtype=np.float64)
         lut[n - 1] = SRM_LUT_A[baqmode][thidx]
     else:
@@ -956,6 +958,22 @@ def get_baq_lut(baqmode: EBaqMode, thidx: int, dtype="float32"):
     return lut.astype(dtype)
 
 
+@lru_cache
+def get_baq_lut_table(baqmode: EBaqMode, dtype="float32"):
+    """Return all the BAQ reconstruction LUTs for the specified BAQ mode.
+
+    The returned array has shape (256, 2**nbits) and it is indexed by
+    (THIDX, sample code).
+    """
+    import numpy as np
+
+    table = np.stack(
+        [get_baq_lut(baqmode, thidx, dtype) for thidx in range(256)]
+    )
+    table.flags.writeable = False
+    return table
+
+
 BRC_SIZE = {
     EBrcCode.BRC0: 4,
     EBrcCode.BRC1: 5,
@@ -987,3 +1005,23 @@ def get_fdbaq_lut(brc: EBrcCode, thidx: int, dtype="float32"):
     lut[n:] = -lut[:n]
 
     return lut.astype(dtype)
+
+
+@lru_cache
+def get_fdbaq_lut_table(dtype="float32"):
+    """Return all the FDBAQ reconstruction LUTs stacked in a single array.
+
+    The returned array has shape (5, 256, 32) and it is indexed by
+    (BRC, THIDX, sample code).
+    LUTs shorter than 32 elements (BRC < 4) are zero padded.
+    """
+    import numpy as np
+
+    size = 2 * max(BRC_SIZE.values())
+    table = np.zeros((len(EBrcCode), 256, size), dtype=dtype)
+    for brc in EBrcCode:
+        for thidx in range(256):
+            lut = get_fdbaq_lut(brc, thidx, dtype)
+            table[brc, thidx, : len(lut)] = lut
+    table.flags.writeable = False
+    return table
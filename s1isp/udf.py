@@ -6,13 +6,15 @@ in the "Sentinel-1 SAR Space Packet Protocol Data Unit" document
 """
 
 import enum
+import concurrent.futures
 from typing import Optional
 
 import numpy as np
 import bpack.np
 
+from . import _udf
 from . import _huffman as huffman
-from .luts import get_baq_lut, get_fdbaq_lut
+from .luts import get_baq_lut_table, get_fdbaq_lut_table
 from .enums import EBaqMode, ETestMode
 
 BLOCKSIZE = 128  # 128 odd + 128 even = 256
@@ -32,16 +34,7 @@ class EDataFormatType(enum.Enum):
     D = "D"
 
 
-def get_data_format_type(
-    baqmod: EBaqMode, tstmod: ETestMode
-) -> EDataFormatType:
-    """Return the data format type.
-
-    See S1-IF-ASD-PL-0007 section 3.3.2 Table 3.3-2.
-    """
-    tstmod = ETestMode(tstmod)
-    baqmod = EBaqMode(baqmod)
-
+def _make_data_format_type_table():
     bypass_modes = {
         ETestMode.CONTINGENCY_RXM_FULLY_BYPASSED,
         ETestMode.BYPASS,
@@ -51,25 +44,46 @@ def get_data_format_type(
         ETestMode.CONTINGENCY_RXM_FULLY_OPERATIONAL,
         ETestMode.OPER,
     }
+    baq_modes = {EBaqMode.BAQ3, EBaqMode.BAQ4, EBaqMode.BAQ5}
+    fdbaq_modes = {
+        EBaqMode.FDBAQ_MODE_0,
+        EBaqMode.FDBAQ_MODE_1,
+        EBaqMode.FDBAQ_MODE_2,
+    }
 
-    if tstmod in bypass_modes:
-        if baqmod == EBaqMode.BYPASS:
-            return EDataFormatType.A
-    elif tstmod in oper_modes:
-        if baqmod == EBaqMode.BYPASS:
-            return EDataFormatType.B
-        elif baqmod in {EBaqMode.BAQ3, EBaqMode.BAQ4, EBaqMode.BAQ5}:
-            return EDataFormatType.C
-        elif baqmod in {
-            EBaqMode.FDBAQ_MODE_0,
-            EBaqMode.FDBAQ_MODE_1,
-            EBaqMode.FDBAQ_MODE_2,
-        }:
-            return EDataFormatType.D
-
-    raise ValueError(
-        f"Invalid combination: baqmod={baqmod.name}, testmod={tstmod.name}."
-    )
+    table = {}
+    for tstmod in bypass_modes:
+        table[(tstmod, EBaqMode.BYPASS)] = EDataFormatType.A
+    for tstmod in oper_modes:
+        table[(tstmod, EBaqMode.BYPASS)] = EDataFormatType.B
+        for baqmod in baq_modes:
+            table[(tstmod, baqmod)] = EDataFormatType.C
+        for baqmod in fdbaq_modes:
+            table[(tstmod, baqmod)] = EDataFormatType.D
+    return table
+
+
+# (test mode, BAQ mode) -> data format type
+# N.B. keys are IntEnum so lookups also work with plain int values
+_DATA_FORMAT_TYPE_TABLE = _make_data_format_type_table()
+
+
+def get_data_format_type(
+    baqmod: EBaqMode, tstmod: ETestMode
+) -> EDataFormatType:
+    """Return the data format type.
+
+    See S1-IF-ASD-PL-0007 section 3.3.2 Table 3.3-2.
+    """
+    data_format_type = _DATA_FORMAT_TYPE_TABLE.get((tstmod, baqmod))
+    if data_format_type is None:
+        tstmod = ETestMode(tstmod)
+        baqmod = EBaqMode(baqmod)
+        raise ValueError(
+            f"Invalid combination: baqmod={baqmod.name}, "
+            f"testmod={tstmod.name}."
+        )
+    return data_format_type
 
 
 def align_quads(
@@ -103,6 +117,49 @@ def align_quads(
     return out
 
 
+def _run_kernel(kernel, nq: int, *args, out=None) -> np.ndarray:
+    """Run a :mod:`._udf` kernel storing the aligned quads in `out`.
+
+    The kernel writes directly in the output buffer if it is a
+    contiguous complex64 array, otherwise results are copied in `out`.
+    """
+    if out is None:
+        out = np.empty(nq * 2, dtype=np.complex64)
+    assert out.size == 2 * nq
+
+    if out.dtype == np.complex64 and out.flags.c_contiguous:
+        view = out.view(np.float32).reshape(nq, 4)
+        kernel(*args, out=view)
+    else:
+        data = kernel(*args)
+        out[...] = data.view(np.complex64).reshape(-1)
+
+    return out
+
+
+def _reconstruct(
+    luts: np.ndarray,
+    ie: np.ndarray,
+    io: np.ndarray,
+    qe: np.ndarray,
+    qo: np.ndarray,
+    nq: int,
+    blocksize: int,
+    *,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Reconstruct and align samples using one LUT per block.
+
+    `luts` is a 2D array containing the reconstruction LUT of each block.
+    The LUT gather and the alignment of the quads are fused, so that no
+    intermediate array of reconstructed samples is needed.
+    """
+    luts = np.ascontiguousarray(luts, dtype=np.float32)
+    return _run_kernel(
+        _udf.reconstruct, nq, luts, ie, io, qe, qo, nq, blocksize, out=out
+    )
+
+
 def bypass_decode(
     data: bytes,
     nq: int,
@@ -113,33 +170,8 @@ def bypass_decode(
 
     See section 4 and 4.2 of S1-IF-ASD-PL-0007.
     """
-    bits_per_sample = 10
-    nw = int(np.ceil(bits_per_sample / 16 * nq))
-    assert len(data) >= (2 * nw) * 4
-    nbytes = nw * 2
-
-    ie = bpack.np.unpackbits(
-        data[:nbytes],
-        bits_per_sample=bits_per_sample,
-        sign_mode=bpack.np.ESignMode.SIGN_AND_MOD,
-    )
-    io = bpack.np.unpackbits(
-        data[nbytes : 2 * nbytes],
-        bits_per_sample=bits_per_sample,
-        sign_mode=bpack.np.ESignMode.SIGN_AND_MOD,
-    )
-    qe = bpack.np.unpackbits(
-        data[2 * nbytes : 3 * nbytes],
-        bits_per_sample=bits_per_sample,
-        sign_mode=bpack.np.ESignMode.SIGN_AND_MOD,
-    )
-    qo = bpack.np.unpackbits(
-        data[3 * nbytes :],
-        bits_per_sample=bits_per_sample,
-        sign_mode=bpack.np.ESignMode.SIGN_AND_MOD,
-    )
-
-    return align_quads(ie, io, qe, qo, nq, out=out)
+    data = np.frombuffer(data, dtype=np.uint8)
+    return _run_kernel(_udf.bypass, nq, data, nq, out=out)
 
 
 def baq_decode(
@@ -156,14 +188,16 @@ def baq_decode(
 
     See section 4 and 4.3 of S1-IF-ASD-PL-0007.
     """
+    data = memoryview(data).cast("B")  # slices without copies
     bits_per_sample = baqmod.value
-    nb = int(np.ceil(nq / blocksize))  # == ceil(2 * nq / (256 // 2))
+    nb = (nq + blocksize - 1) // blocksize  # ceil(nq / blocksize)
 
-    nw_ie = int(np.ceil(bits_per_sample * nq / 16))
+    nw_ie = (bits_per_sample * nq + 15) // 16
     nw_io = nw_ie
-    nw_qe = int(np.ceil((bits_per_sample * nq + 8 * nb) / 16))
+    nw_qe = (bits_per_sample * nq + 8 * nb + 15) // 16
     nw_qo = nw_ie
-    assert len(data) >= 2 * (nw_ie + nw_io + nw_qe + nw_qo)
+    if len(data) < 2 * (nw_ie + nw_io + nw_qe + nw_qo):
+        raise ValueError(f"Not enough input data to decode {nq} quads.")
 
     offset = 0
     nbytes = 2 * nw_ie
@@ -197,22 +231,13 @@ def baq_decode(
         data[offset : offset + nbytes], bits_per_sample=bits_per_sample
     )
 
-    # TODO: use out directly
-    decoded_ie = np.empty(len(ie), dtype=np.float32)
-    decoded_io = np.empty(len(io), dtype=np.float32)
-    decoded_qe = np.empty(len(qe), dtype=np.float32)
-    decoded_qo = np.empty(len(qo), dtype=np.float32)
-    for bidx, thidx in enumerate(thidx_data):
-        lut = get_baq_lut(baqmod, thidx)
-        idx = slice(bidx * blocksize, (bidx + 1) * blocksize)
-        decoded_ie[idx] = lut[ie[idx]]
-        decoded_io[idx] = lut[io[idx]]
-        decoded_qe[idx] = lut[qe[idx]]
-        decoded_qo[idx] = lut[qo[idx]]
-
-    return align_quads(
-        decoded_ie, decoded_io, decoded_qe, decoded_qo, nq, out=out
-    )
+    luts = get_baq_lut_table(baqmod)[thidx_data[:nb]]
+    return _reconstruct(luts, ie, io, qe, qo, nq, blocksize, out=out)
+
+
+def _align16(idx: int) -> int:
+    """Round the bit index up to the next 16-bit word boundary."""
+    return (idx + 15) & ~15
 
 
 def huffman_decode(
@@ -224,12 +249,12 @@ def huffman_decode(
     thidx_size: int = THIDX_SIZE,
 ):
     """Decode Huffman encoded data."""
-    nb = int(np.ceil(nq / blocksize))  # == ceil(2 * nq / 256)
+    nb = (nq + blocksize - 1) // blocksize  # ceil(nq / blocksize)
 
     brc_data = np.empty(nb, dtype=np.uint8)
     thidx_data = np.empty(nb, dtype=np.uint8)
 
-    idx = idx0 = 0
+    idx = 0
     ie = np.empty(nq, dtype=np.uint8)
     for bidx in range(nb):
         brc_data[bidx] = (
@@ -246,10 +271,8 @@ def huffman_decode(
             count=True,
         )
         idx += count
-    nwords = int(np.ceil((idx - idx0) / 16))
-    idx = idx0 + nwords * 16
+    idx = _align16(idx)
 
-    idx0 = idx
     io = np.empty(nq, dtype=np.uint8)
     for bidx in range(nb):
         i0 = bidx * blocksize
@@ -262,10 +285,8 @@ def huffman_decode(
             count=True,
         )
         idx += count
-    nwords = int(np.ceil((idx - idx0) / 16))
-    idx = idx0 + nwords * 16
+    idx = _align16(idx)
 
-    idx0 = idx
     qe = np.empty(nq, dtype=np.uint8)
     for bidx in range(nb):
         thidx_data[bidx] = np.packbits(bits[idx : idx + thidx_size]).item()
@@ -280,10 +301,8 @@ def huffman_decode(
             count=True,
         )
         idx += count
-    nwords = int(np.ceil((idx - idx0) / 16))
-    idx = idx0 + nwords * 16
+    idx = _align16(idx)
 
-    idx0 = idx
     qo = np.empty(nq, dtype=np.uint8)
     for bidx in range(nb):
         i0 = bidx * blocksize
@@ -296,10 +315,9 @@ def huffman_decode(
             count=True,
         )
         idx += count
-    nwords = int(np.ceil((idx - idx0) / 16))
-    idx = idx0 + nwords * 16
+    idx = _align16(idx)
 
-    n_octets_with_fill = int(np.ceil((idx // 8) / 4)) * 4
+    n_octets_with_fill = (idx // 8 + 3) // 4 * 4
     idx = n_octets_with_fill * 8
 
     assert idx == len(bits), f"idx = {idx}, len(bits) = {len(bits)}"
@@ -321,32 +339,12 @@ def fdbaq_decode(
 
     See section 4 and 4.4 of S1-IF-ASD-PL-0007.
     """
-    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
-    ie, io, qe, qo, brc_data, thidx_data = huffman_decode(
-        bits, nq, blocksize=blocksize
+    ie, io, qe, qo, brc_data, thidx_data = huffman.decode_fdbaq(
+        np.frombuffer(data, dtype=np.uint8), nq, blocksize
     )
-    assert len(ie) == len(io) == len(qe) == len(qo) == nq
-
-    # TODO: use out directly
-    decoded_ie = np.empty(nq, dtype=np.float32)
-    decoded_io = np.empty(nq, dtype=np.float32)
-    decoded_qe = np.empty(nq, dtype=np.float32)
-    decoded_qo = np.empty(nq, dtype=np.float32)
 
-    for bidx, (brc, thidx) in enumerate(zip(brc_data, thidx_data)):
-        i0 = bidx * blocksize
-        i1 = min(i0 + blocksize, nq)
-
-        lut = get_fdbaq_lut(brc, thidx)
-
-        decoded_ie[i0:i1] = lut[ie[i0:i1]]
-        decoded_io[i0:i1] = lut[io[i0:i1]]
-        decoded_qe[i0:i1] = lut[qe[i0:i1]]
-        decoded_qo[i0:i1] = lut[qo[i0:i1]]
-
-    return align_quads(
-        decoded_ie, decoded_io, decoded_qe, decoded_qo, nq, out=out
-    )
+    luts = get_fdbaq_lut_table()[brc_data, thidx_data]
+    return _reconstruct(luts, ie, io, qe, qo, nq, blocksize, out=out)
 
 
 def decode_ud(
@@ -362,9 +360,9 @@ def decode_ud(
     data_format_type = get_data_format_type(baqmod, tstmod)
 
     if data_format_type == EDataFormatType.A:
-        return bypass_decode(data, nq)
+        return bypass_decode(data, nq, out=out)
     elif data_format_type == EDataFormatType.B:
-        return bypass_decode(data, nq)
+        return bypass_decode(data, nq, out=out)
     elif data_format_type == EDataFormatType.C:
         return baq_decode(
             data, nq, baqmod=baqmod, blocksize=blocksize, out=out
@@ -373,3 +371,111 @@ def decode_ud(
         return fdbaq_decode(data, nq, blocksize=blocksize, out=out)
     else:
         raise ValueError(f"Invalid data format type: '{data_format_type}'.")
+
+
+def decode_ud_batch(
+    data: bytes,
+    offsets: np.ndarray,
+    sizes: np.ndarray,
+    nqs: np.ndarray,
+    baqmods: np.ndarray,
+    tstmods: np.ndarray,
+    *,
+    out: Optional[np.ndarray] = None,
+    blocksize: int = BLOCKSIZE,
+    max_workers: Optional[int] = 1,
+) -> np.ndarray:
+    """Decode the user data field of multiple packets.
+
+    `offsets` and `sizes` locate the user data field of each packet in
+    the `data` buffer, while `nqs`, `baqmods` and `tstmods` are the
+    number of quads, the BAQ mode and the test mode of each packet
+    (e.g. from :func:`s1isp.bulk.decode_secondary_headers`).
+
+    Decoded samples of all packets are stored contiguously in a single
+    complex64 array: samples of the i-th packet are in
+    ``out[2 * starts[i] : 2 * starts[i + 1]]``, where
+    ``starts = np.cumsum([0, *nqs])``.
+    If provided, `out` must be a 1D, C-contiguous, complex64 array with
+    ``2 * sum(nqs)`` elements.
+
+    Packets are decoded in parallel by a pool of `max_workers` threads
+    (``None`` for the :class:`concurrent.futures.ThreadPoolExecutor`
+    default), each one writing a disjoint slice of `out`.
+    Only the bypass (data formats A and B) and FDBAQ (data format D)
+    kernels release the GIL: the unpacking of BAQ samples (data format
+    C) runs in Python, so those packets get little or no speedup from
+    multiple threads.
+    By default packets are decoded sequentially in the calling thread.
+    """
+    offsets = np.asarray(offsets, dtype=np.intp)
+    sizes = np.asarray(sizes, dtype=np.intp)
+    nqs = np.asarray(nqs, dtype=np.intp)
+    baqmods = np.asarray(baqmods, dtype=np.intp)
+    tstmods = np.asarray(tstmods, dtype=np.intp)
+    lengths = {len(array) for array in (offsets, sizes, nqs, baqmods, tstmods)}
+    if len(lengths) != 1:
+        raise ValueError(
+            f"Inconsistent input lengths: offsets={len(offsets)}, "
+            f"sizes={len(sizes)}, nqs={len(nqs)}, baqmods={len(baqmods)}, "
+            f"tstmods={len(tstmods)}."
+        )
+
+    stops = np.cumsum(2 * nqs)
+    nsamples = int(stops[-1]) if len(stops) else 0
+    if out is None:
+        out = np.empty(nsamples, dtype=np.complex64)
+    elif out.ndim != 1:
+        raise ValueError(
+            f"Invalid output array dimensions: {out.ndim} (1 expected)."
+        )
+    elif out.dtype != np.complex64:
+        raise ValueError(
+            f"Invalid output array dtype: {out.dtype} (complex64 expected)."
+        )
+    elif not out.flags.c_contiguous:
+        raise ValueError("The output array is not C-contiguous.")
+    elif out.size != nsamples:
+        raise ValueError(
+            f"Invalid output array size: {out.size} ({nsamples} expected)."
+        )
+    starts = stops - 2 * nqs
+
+    # validate and convert modes once per distinct combination
+    modes, inverse = np.unique(
+        np.stack([baqmods, tstmods], axis=-1), axis=0, return_inverse=True
+    )
+    inverse = inverse.reshape(-1)
+    tasks = []
+    for idx, (baqmod, tstmod) in enumerate(modes.tolist()):
+        baqmod, tstmod = EBaqMode(baqmod), ETestMode(tstmod)
+        get_data_format_type(baqmod, tstmod)
+        tasks.extend(
+            (pidx, baqmod, tstmod)
+            for pidx in np.flatnonzero(inverse == idx).tolist()
+        )
+
+    buf = memoryview(data)
+
+    def decode(task):
+        pidx, baqmod, tstmod = task
+        offset = offsets[pidx]
+        decode_ud(
+            buf[offset : offset + sizes[pidx]],
+            int(nqs[pidx]),
+            baqmod,
+            tstmod,
+            out=out[starts[pidx] : stops[pidx]],
+            blocksize=blocksize,
+        )
+
+    if max_workers == 1:
+        for task in tasks:
+            decode(task)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            # consume the iterator to propagate exceptions
+            for _ in executor.map(decode, tasks):
+                pass
+
+    return out
@@ -10,6 +10,12 @@ extensions = [
         sources=["s1isp/_huffman.pyx", "src/huffman.c"],
         define_macros=[("NPY_NO_DEPRECATED_API", "NPY_1_7_API_VERSION")],
         include_dirs=["src", np.get_include()],
-    )
+    ),
+    setuptools.Extension(
+        "s1isp._udf",
+        sources=["s1isp/_udf.pyx"],
+        define_macros=[("NPY_NO_DEPRECATED_API", "NPY_1_7_API_VERSION")],
+        include_dirs=[np.get_include()],
+    ),
 ]
 setuptools.setup(ext_modules=extensions)
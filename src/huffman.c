@@ -256,3 +256,198 @@ int huffman_brc4(int nbits, const uint8_t *bits, int nout, uint8_t *out)
     }
     return (sample != nout) ? -idx : idx;
 }  // huffman_brc4
+
+
+// === FDBAQ decoding of packed (8 bits per byte) data ===
+
+#define HUFFMAN_NBRC 5
+#define HUFFMAN_PEEK_BITS 10  // sign bit + longest M-code (BRC4)
+#define HUFFMAN_LUT_SIZE (1 << HUFFMAN_PEEK_BITS)
+#define FDBAQ_BRC_SIZE 3
+#define FDBAQ_THIDX_SIZE 8
+
+// M-codes (without the sign bit) sorted by magnitude, as strings of bits
+static const char *const huffman_mcodes_brc0[] = {
+    "0", "10", "110", "111", NULL
+};
+static const char *const huffman_mcodes_brc1[] = {
+    "0", "10", "110", "1110", "1111", NULL
+};
+static const char *const huffman_mcodes_brc2[] = {
+    "0", "10", "110", "1110", "11110", "111110", "111111", NULL
+};
+static const char *const huffman_mcodes_brc3[] = {
+    "00", "01", "10", "110", "1110", "11110", "111110", "1111110",
+    "11111110", "11111111", NULL
+};
+static const char *const huffman_mcodes_brc4[] = {
+    "00", "010", "011", "100", "101", "1100", "1101", "1110", "11110",
+    "111110", "11111100", "11111101", "111111100", "111111101",
+    "111111110", "111111111", NULL
+};
+static const char *const *const huffman_mcodes[HUFFMAN_NBRC] = {
+    huffman_mcodes_brc0,
+    huffman_mcodes_brc1,
+    huffman_mcodes_brc2,
+    huffman_mcodes_brc3,
+    huffman_mcodes_brc4,
+};
+
+// Each LUT entry is indexed by the next HUFFMAN_PEEK_BITS bits of the
+// stream and stores the number of bits of the code in the high byte and
+// the decoded value (with the same encoding of huffman_brcN) in the low byte
+static uint16_t huffman_luts[HUFFMAN_NBRC][HUFFMAN_LUT_SIZE];
+static int huffman_luts_ready = 0;
+
+
+void huffman_init_luts(void)
+{
+    int brc, mag, nmag, sign, len, i, code, shift, first, count;
+    const char *const *mcodes;
+
+    if (huffman_luts_ready)
+    {
+        return;
+    }
+
+    for (brc = 0; brc < HUFFMAN_NBRC; ++brc)
+    {
+        mcodes = huffman_mcodes[brc];
+        for (nmag = 0; mcodes[nmag] != NULL; ++nmag);
+
+        for (mag = 0; mag < nmag; ++mag)
+        {
+            code = 0;
+            for (len = 0; mcodes[mag][len] != '\0'; ++len)
+            {
+                code = (code << 1) | (mcodes[mag][len] == '1');
+            }
+            len += 1;  // sign bit
+            shift = HUFFMAN_PEEK_BITS - len;
+            count = 1 << shift;
+            for (sign = 0; sign < 2; ++sign)
+            {
+                first = ((sign << (len - 1)) | code) << shift;
+                for (i = first; i < first + count; ++i)
+                {
+                    huffman_luts[brc][i] = (uint16_t)(
+                        (len << 8) | (sign ? nmag + mag : mag));
+                }
+            }
+        }
+    }
+    huffman_luts_ready = 1;
+}  // huffman_init_luts
+
+
+typedef struct
+{
+    const uint8_t *data;
+    size_t nbytes;
+    size_t next;    // index of the next byte to be loaded in the buffer
+    size_t pos;     // number of consumed bits
+    uint64_t buf;   // left aligned bit buffer
+    int nbuf;       // number of valid bits in the buffer
+} bitreader;
+
+
+static inline void bitreader_refill(bitreader *reader)
+{
+    uint64_t byte;
+    while (reader->nbuf <= 56)
+    {
+        byte = (reader->next < reader->nbytes) ? reader->data[reader->next] : 0;
+        reader->buf |= byte << (56 - reader->nbuf);
+        reader->next += 1;
+        reader->nbuf += 8;
+    }
+}  // bitreader_refill
+
+
+static inline unsigned int bitreader_peek(const bitreader *reader, int nbits)
+{
+    return (unsigned int)(reader->buf >> (64 - nbits));
+}  // bitreader_peek
+
+
+static inline void bitreader_skip(bitreader *reader, int nbits)
+{
+    reader->buf <<= nbits;
+    reader->nbuf -= nbits;
+    reader->pos += nbits;
+}  // bitreader_skip
+
+
+static inline void bitreader_align16(bitreader *reader)
+{
+    bitreader_refill(reader);
+    bitreader_skip(reader, (int)(((reader->pos + 15) & ~(size_t)15) - reader->pos));
+}  // bitreader_align16
+
+
+static inline void huffman_decode_block(
+    bitreader *reader, const uint16_t *lut, int nout, uint8_t *out)
+{
+    int sample;
+    uint16_t entry;
+    for (sample = 0; sample < nout; ++sample)
+    {
+        // the buffer always contains at least 56 bits after refill,
+        // enough for 5 codes of HUFFMAN_PEEK_BITS bits
+        if (reader->nbuf < HUFFMAN_PEEK_BITS)
+        {
+            bitreader_refill(reader);
+        }
+        entry = lut[bitreader_peek(reader, HUFFMAN_PEEK_BITS)];
+        out[sample] = (uint8_t)(entry & 0xff);
+        bitreader_skip(reader, entry >> 8);
+    }
+}  // huffman_decode_block
+
+
+int huffman_decode_fdbaq(
+    const uint8_t *data, size_t nbytes, int nq, int blocksize,
+    uint8_t *ie, uint8_t *io, uint8_t *qe, uint8_t *qo,
+    uint8_t *brc, uint8_t *thidx)
+{
+    bitreader reader = {data, nbytes, 0, 0, 0, 0};
+    int nb = (nq + blocksize - 1) / blocksize;
+    int bidx, i0, n, channel;
+    uint8_t *const outs[4] = {ie, io, qe, qo};
+
+    huffman_init_luts();
+
+    for (channel = 0; channel < 4; ++channel)
+    {
+        for (bidx = 0; bidx < nb; ++bidx)
+        {
+            bitreader_refill(&reader);
+            if (channel == 0)
+            {
+                brc[bidx] = (uint8_t)bitreader_peek(&reader, FDBAQ_BRC_SIZE);
+                bitreader_skip(&reader, FDBAQ_BRC_SIZE);
+                if (brc[bidx] >= HUFFMAN_NBRC)
+                {
+                    return HUFFMAN_ERR_BRC;
+                }
+            }
+            else if (channel == 2)
+            {
+                thidx[bidx] = (uint8_t)bitreader_peek(
+                    &reader, FDBAQ_THIDX_SIZE);
+                bitreader_skip(&reader, FDBAQ_THIDX_SIZE);
+            }
+            i0 = bidx * blocksize;
+            n = (i0 + blocksize < nq) ? blocksize : nq - i0;
+            huffman_decode_block(
+                &reader, huffman_luts[brc[bidx]], n, outs[channel] + i0);
+        }
+        bitreader_align16(&reader);
+        if (reader.pos > 8 * nbytes)
+        {
+            return HUFFMAN_ERR_EOD;
+        }
+    }
+
+    return (int)(reader.pos / 8);
+}  // huffman_decode_fdbaq
@@ -3,12 +3,22 @@
 #ifndef HUFFMAN_H_INCLUDED
 #define HUFFMAN_H_INCLUDED
 
+#include <stddef.h>
 #include <stdint.h>
 
+#define HUFFMAN_ERR_EOD -1  // not enough data
+#define HUFFMAN_ERR_BRC -2  // invalid BRC code
+
 int huffman_brc0(int nbits, const uint8_t *bits, int nout, uint8_t *out);
 int huffman_brc1(int nbits, const uint8_t *bits, int nout, uint8_t *out);
 int huffman_brc2(int nbits, const uint8_t *bits, int nout, uint8_t *out);
 int huffman_brc3(int nbits, const uint8_t *bits, int nout, uint8_t *out);
 int huffman_brc4(int nbits, const uint8_t *bits, int nout, uint8_t *out);
 
+void huffman_init_luts(void);
+int huffman_decode_fdbaq(
+    const uint8_t *data, size_t nbytes, int nq, int blocksize,
+    uint8_t *ie, uint8_t *io, uint8_t *qe, uint8_t *qo,
+    uint8_t *brc, uint8_t *thidx);
+
 #endif  // HUFFMAN_H_INCLUDED
@@ -6,17 +6,21 @@ import pathlib
 import numpy as np
 import pytest
 
+from s1isp.constants import PRIMARY_HEADER_SIZE as PHSIZE
+from s1isp.constants import SECONDARY_HEADER_SIZE as SHSIZE
+from s1isp.descriptors import SecondaryHeader
+
 DATAROOT = pathlib.Path(__file__).parent / "data"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def txcal_data():
     filename = DATAROOT / "000008-txcal.dat"
     with open(filename, "rb") as fd:
         return fd.read()
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def txcal_ref_data():
     # keys: "primary_header", "secondary_header", "udf"
     filename = DATAROOT / "000008-txcal.npz"
@@ -24,14 +28,14 @@ def txcal_ref_data():
     return {k: v.item() if "header" in k else v for k, v in data.items()}
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def noise_data():
     filename = DATAROOT / "000000-noise.dat"
     with open(filename, "rb") as fd:
         return fd.read()
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def noise_ref_data():
     # keys: "primary_header", "secondary_header", "udf"
     filename = DATAROOT / "000000-noise.npz"
@@ -39,14 +43,14 @@ def noise_ref_data():
     return {k: v.item() if "header" in k else v for k, v in data.items()}
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def echo_data():
     filename = DATAROOT / "000408-echo.dat"
     with open(filename, "rb") as fd:
         return fd.read()
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def echo_ref_data():
     # keys: "primary_header", "secondary_header", "udf"
     filename = DATAROOT / "000408-echo.npz"
@@ -54,8 +58,32 @@ def echo_ref_data():
     return {k: v.item() if "header" in k else v for k, v in data.items()}
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def fdbaq_reconstruction_lut():
     filename = DATAROOT / "reconstruction-lut.json"
     with open(filename) as fd:
         return json.load(fd)
+
+
+@pytest.fixture(scope="session")
+def txcal_secondary_header(txcal_data):
+    return SecondaryHeader.frombytes(txcal_data[PHSIZE : PHSIZE + SHSIZE])
+
+
+@pytest.fixture(scope="session")
+def noise_secondary_header(noise_data):
+    return SecondaryHeader.frombytes(noise_data[PHSIZE : PHSIZE + SHSIZE])
+
+
+@pytest.fixture(scope="session")
+def echo_secondary_header(echo_data):
+    return SecondaryHeader.frombytes(echo_data[PHSIZE : PHSIZE + SHSIZE])
+
+
+@pytest.fixture
+def stream_file(tmp_path, noise_data, txcal_data, echo_data):
+    filename = tmp_path / "stream.dat"
+    with open(filename, "wb") as fd:
+        for data in (noise_data, txcal_data, echo_data):
+            fd.write(data)
+    return filename
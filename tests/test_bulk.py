@@ -0,0 +1,296 @@
+"""Tests for vectorized header decoding."""
+
+import numpy as np
+import pytest
+from numpy import testing as npt
+
+from s1isp import bulk
+from s1isp.bulk import record_from_arrays, decode_secondary_headers
+from s1isp.enums import ERangeDecimation
+from s1isp.decoder import SubCommutatedDataDecoder, scan_stream
+from s1isp.descriptors import (
+    PrimaryHeader,
+    SyncMarkerError,
+    PVTAncillaryData,
+    AttitudeAncillaryData,
+    HKTemperatureAncillaryData,
+    RadarConfigurationSupportService,
+    SubCommutatedAncillaryDataService,
+)
+
+
+@pytest.fixture
+def stream_arrays(stream_file):
+    offsets = scan_stream(stream_file)[:-1]
+    return decode_secondary_headers(stream_file.read_bytes(), offsets)
+
+
+def test_decode_secondary_headers(
+    stream_arrays, noise_ref_data, txcal_ref_data, echo_ref_data
+):
+    ref_data = [noise_ref_data, txcal_ref_data, echo_ref_data]
+    for name, array in stream_arrays.items():
+        assert len(array) == len(ref_data), name
+
+    assert not stream_arrays["bad_sync_marker"].any()
+    for idx, ref in enumerate(ref_data):
+        ref_sh = ref["secondary_header"]
+        assert record_from_arrays(stream_arrays, idx) == ref_sh
+        assert stream_arrays["coarse_time"][idx] == ref_sh.datation.coarse_time
+        rcss = ref_sh.radar_configuration_support
+        assert stream_arrays["swst"][idx] == rcss.swst
+        assert stream_arrays["baq_mode"][idx] == rcss.baq_mode
+
+
+def test_decode_primary_headers(
+    stream_file, noise_ref_data, txcal_ref_data, echo_ref_data
+):
+    ref_data = [noise_ref_data, txcal_ref_data, echo_ref_data]
+    offsets = scan_stream(stream_file)[:-1]
+    arrays = bulk.decode_primary_headers(stream_file.read_bytes(), offsets)
+    for idx, ref in enumerate(ref_data):
+        record = record_from_arrays(arrays, idx, PrimaryHeader)
+        assert record == ref["primary_header"]
+
+
+def test_decode_secondary_headers_bad_sync(stream_file):
+    data = bytearray(stream_file.read_bytes())
+    offsets = scan_stream(stream_file)[:-1]
+    data[offsets[1] + 12] ^= 0xFF  # corrupt the sync marker
+    arrays = decode_secondary_headers(data, offsets)
+    assert arrays["bad_sync_marker"].tolist() == [False, True, False]
+    with pytest.raises(SyncMarkerError, match="packet count: 2"):
+        decode_secondary_headers(data, offsets, check_sync=True)
+    with pytest.raises(SyncMarkerError):
+        bulk.check_sync_marker(arrays["sync_marker"])
+    bulk.check_sync_marker(arrays["sync_marker"][[0, 2]])
+
+
+def test_decode_secondary_headers_empty(stream_file):
+    arrays = decode_secondary_headers(stream_file.read_bytes(), [])
+    assert all(len(array) == 0 for array in arrays.values())
+    assert arrays["coarse_time"].dtype == np.uint32
+
+
+def test_record_from_arrays_nested(stream_arrays, echo_ref_data):
+    rcss = echo_ref_data["secondary_header"].radar_configuration_support
+    record = record_from_arrays(
+        stream_arrays, 2, RadarConfigurationSupportService
+    )
+    assert record == rcss
+
+
+def test_rcss_derived_quantities(stream_arrays, noise_ref_data, echo_ref_data):
+    ref_data = [noise_ref_data, echo_ref_data]
+    ref_rcss = [
+        ref["secondary_header"].radar_configuration_support for ref in ref_data
+    ]
+    arrays = {name: array[[0, 2]] for name, array in stream_arrays.items()}
+
+    npt.assert_array_equal(
+        bulk.get_baq_block_len_samples(arrays["baq_block_length"]),
+        [rcss.get_baq_block_len_samples() for rcss in ref_rcss],
+    )
+    npt.assert_allclose(
+        bulk.get_rx_gain_db(arrays["rx_gain"]),
+        [rcss.get_rx_gain_db() for rcss in ref_rcss],
+    )
+    npt.assert_allclose(
+        bulk.get_tx_ramp_rate_hz_per_sec(arrays["tx_ramp_rate"]),
+        [rcss.get_tx_ramp_rate_hz_per_sec() for rcss in ref_rcss],
+    )
+    npt.assert_allclose(
+        bulk.get_tx_pulse_start_freq_hz(
+            arrays["tx_pulse_start_freq"], arrays["tx_ramp_rate"]
+        ),
+        [rcss.get_tx_pulse_start_freq_hz() for rcss in ref_rcss],
+    )
+    npt.assert_allclose(
+        bulk.get_tx_pulse_length_sec(arrays["tx_pulse_length"]),
+        [rcss.get_tx_pulse_length_sec() for rcss in ref_rcss],
+    )
+    npt.assert_allclose(
+        bulk.get_pri_sec(arrays["pri"]),
+        [rcss.get_pri_sec() for rcss in ref_rcss],
+    )
+    npt.assert_allclose(
+        bulk.get_swst_sec(arrays["swst"]),
+        [rcss.get_swst_sec() for rcss in ref_rcss],
+    )
+    npt.assert_allclose(
+        bulk.get_swl_sec(arrays["swl"]),
+        [rcss.get_swl_sec() for rcss in ref_rcss],
+    )
+    npt.assert_allclose(
+        bulk.get_fine_time_sec(arrays["fine_time"]),
+        [
+            ref["secondary_header"].datation.get_fine_time_sec()
+            for ref in ref_data
+        ],
+    )
+
+
+def test_get_time_sec(stream_arrays, echo_ref_data):
+    datation = echo_ref_data["secondary_header"].datation
+    time_sec = bulk.get_time_sec(
+        stream_arrays["coarse_time"], stream_arrays["fine_time"]
+    )
+    assert time_sec.dtype == np.float64
+    assert time_sec[2] == datation.coarse_time + datation.get_fine_time_sec()
+
+
+def test_get_swl_n3rx_samples():
+    rdcodes = np.repeat(list(ERangeDecimation), 50)
+    swl = np.tile(np.arange(1, 20001, 400), len(ERangeDecimation))
+    assert (2 * swl < 87 + 17).any()  # short SWL values (negative B)
+    expected = [
+        RadarConfigurationSupportService(
+            range_decimation=ERangeDecimation(rdcode), swl=int(swl_)
+        ).get_swl_n3rx_samples()
+        for rdcode, swl_ in zip(rdcodes, swl)
+    ]
+    npt.assert_array_equal(bulk.get_swl_n3rx_samples(rdcodes, swl), expected)
+
+
+def test_get_tx_pulse_length_samples():
+    rdcodes = np.repeat(list(ERangeDecimation), 50)
+    txpl = np.tile(np.arange(100, 5100, 100), len(ERangeDecimation))
+    expected = [
+        RadarConfigurationSupportService(
+            range_decimation=ERangeDecimation(rdcode),
+            tx_pulse_length=int(txpl_),
+        ).get_tx_pulse_length_samples()
+        for rdcode, txpl_ in zip(rdcodes, txpl)
+    ]
+    npt.assert_array_equal(
+        bulk.get_tx_pulse_length_samples(rdcodes, txpl), expected
+    )
+    with pytest.raises(ValueError):
+        bulk.get_tx_pulse_length_samples([2], [100])
+
+
+def test_get_swl_n3rx_samples_invalid_code():
+    with pytest.raises(ValueError):
+        bulk.get_swl_n3rx_samples([0, 2], [1000, 1000])
+
+
+def test_get_tile_temperatures():
+    records = [
+        HKTemperatureAncillaryData(tile1_efeh_temperature=idx)
+        for idx in range(3)
+    ]
+    tiles = bulk.get_tile_temperatures(records)
+    assert tiles.shape == (3, 14, 3)
+    npt.assert_array_equal(tiles[:, 0, 0], [0, 1, 2])
+    assert bulk.get_tile_temperatures([]).shape == (0, 14, 3)
+
+
+@pytest.mark.parametrize(
+    "descriptor, decode",
+    [
+        (PVTAncillaryData, bulk.decode_pvt),
+        (AttitudeAncillaryData, bulk.decode_attitude),
+        (HKTemperatureAncillaryData, bulk.decode_hk),
+    ],
+)
+def test_decode_subcomm_records(descriptor, decode):
+    rng = np.random.default_rng(0)
+    size = descriptor._BPACK_SIZE_BYTES
+    data = rng.integers(0, 256, size=5 * size, dtype=np.uint8).tobytes()
+    arrays = decode(data)
+    for idx in range(5):
+        expected = descriptor.frombytes(data[idx * size : (idx + 1) * size])
+        record = record_from_arrays(arrays, idx, descriptor)
+        # compare repr since random floats can be NaN
+        assert repr(record) == repr(expected)
+
+
+def test_decode_hk_tile_temperatures():
+    rng = np.random.default_rng(0)
+    size = HKTemperatureAncillaryData._BPACK_SIZE_BYTES
+    data = rng.integers(0, 256, size=3 * size, dtype=np.uint8).tobytes()
+    tiles = bulk.decode_hk(data)["tile_temperatures"]
+    records = [
+        HKTemperatureAncillaryData.frombytes(data[idx : idx + size])
+        for idx in range(0, len(data), size)
+    ]
+    npt.assert_array_equal(tiles, bulk.get_tile_temperatures(records))
+
+
+def test_reassemble_subcomm():
+    rng = np.random.default_rng(0)
+    index = np.concatenate(
+        [np.arange(1, 65), [0, 0], np.arange(1, 65), np.arange(1, 11)]
+    )
+    words = rng.integers(0, 2**16, size=len(index), dtype=np.uint16)
+    packet_count = np.arange(len(index))
+
+    items = [
+        (
+            count,
+            SubCommutatedAncillaryDataService(idx, word.to_bytes(2, "big")),
+        )
+        for count, idx, word in zip(
+            packet_count.tolist(), index.tolist(), words.tolist()
+        )
+    ]
+    expected = SubCommutatedDataDecoder().decode(items)
+
+    cycles, complete = bulk.reassemble_subcomm(index, words, packet_count)
+    assert cycles.shape == (3, 64)
+    assert complete.tolist() == [True, True, False]
+
+    arrays = bulk.decode_pvt(cycles[complete, 0:22].tobytes())
+    for idx, item in enumerate(expected):
+        record = record_from_arrays(arrays, idx, PVTAncillaryData)
+        assert repr(record) == repr(item.pvt)
+
+    # data gap
+    _, complete = bulk.reassemble_subcomm(index, words, packet_count**2)
+    assert not complete.any()
+
+
+def test_reassemble_subcomm_corrupted():
+    rng = np.random.default_rng(0)
+    index = np.concatenate(
+        [
+            np.arange(1, 65),
+            # repeated index
+            np.arange(1, 31),
+            np.arange(30, 65),
+            # out of order indices
+            np.arange(1, 11),
+            [12, 11],
+            np.arange(13, 65),
+            # cycle not starting at index 1
+            np.arange(5, 65),
+            np.arange(1, 65),
+        ]
+    )
+    words = rng.integers(0, 2**16, size=len(index), dtype=np.uint16)
+    packet_count = np.arange(len(index))
+
+    decoder = SubCommutatedDataDecoder()
+    for count, idx, word in zip(
+        packet_count.tolist(), index.tolist(), words.tolist()
+    ):
+        item = SubCommutatedAncillaryDataService(idx, word.to_bytes(2, "big"))
+        decoder.feed((count, item))
+    decoder.finalize()
+    expected_complete = [
+        handler.is_complete() for handler in decoder._cycle_data
+    ]
+    assert expected_complete == [True, False, False, False, False, True]
+
+    cycles, complete = bulk.reassemble_subcomm(index, words, packet_count)
+    assert complete.tolist() == expected_complete
+    for cycle, handler in zip(cycles, decoder._cycle_data):
+        for item in handler.data:
+            word = int.from_bytes(item.data_word, "big")
+            if item.data_word_index != 30:  # the repeated one
+                assert cycle[item.data_word_index - 1] == word
+
+    # 64 words with a repeated (and so a missing) index
+    index = np.concatenate([np.arange(1, 31), np.arange(30, 64)])
+    _, complete = bulk.reassemble_subcomm(index, np.zeros(64, np.uint16))
+    assert complete.tolist() == [False]
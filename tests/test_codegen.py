@@ -0,0 +1,105 @@
+"""Tests for specialized header decoders."""
+
+import random
+
+import bpack
+import pytest
+
+import s1isp.descriptors
+from s1isp._codegen import make_decoder
+from s1isp.constants import PRIMARY_HEADER_SIZE as PHSIZE
+from s1isp.constants import SECONDARY_HEADER_SIZE as SHSIZE
+from s1isp.descriptors import (
+    PrimaryHeader,
+    DatationService,
+    PVTAncillaryData,
+    SecondaryHeader,
+    AttitudeAncillaryData,
+    SubCommutatedAncillaryDataService,
+)
+
+
+@pytest.fixture(params=["noise", "txcal", "echo"])
+def isp_data(request):
+    data = request.getfixturevalue(f"{request.param}_data")
+    ref_data = request.getfixturevalue(f"{request.param}_ref_data")
+    return data, ref_data
+
+
+def test_decode_primary_header(isp_data):
+    data, ref_data = isp_data
+    decode = make_decoder(PrimaryHeader)
+    primary_header = decode(data)
+    assert primary_header == ref_data["primary_header"]
+    assert primary_header == PrimaryHeader.frombytes(data[:PHSIZE])
+
+
+def test_decode_secondary_header(isp_data):
+    data, ref_data = isp_data
+    decode = make_decoder(SecondaryHeader)
+    secondary_header = decode(data, PHSIZE)
+    assert secondary_header == ref_data["secondary_header"]
+    shdata = data[PHSIZE : PHSIZE + SHSIZE]
+    assert secondary_header == SecondaryHeader.frombytes(shdata)
+    assert decode(memoryview(data), PHSIZE) == secondary_header
+
+
+def test_decode_types():
+    data = bytes([0x01, 0x80, 0x02])
+    decode = make_decoder(SubCommutatedAncillaryDataService)
+    item = decode(data)
+    assert item == SubCommutatedAncillaryDataService.frombytes(data)
+    assert isinstance(item.data_word, bytes)
+
+
+@pytest.mark.parametrize(
+    "descriptor", [PVTAncillaryData, AttitudeAncillaryData]
+)
+def test_decode_floats(descriptor):
+    size = bpack.calcsize(descriptor, bpack.EBaseUnits.BYTES)
+    data = bytes(range(7, 7 + size))
+    decode = make_decoder(descriptor)
+    assert decode(data) == descriptor.frombytes(data)
+    assert decode(bytes(3) + data, 3) == descriptor.frombytes(data)
+
+
+def test_decode_short_data():
+    decode = make_decoder(DatationService)
+    with pytest.raises(ValueError):
+        decode(bytes(5))
+
+
+def test_decoder_cache():
+    assert make_decoder(PrimaryHeader) is make_decoder(PrimaryHeader)
+
+
+def test_decode_invalid_enum(echo_data):
+    data = bytearray(echo_data)
+    data[PHSIZE + 14] = 0xF0  # invalid ecc_num
+    with pytest.raises(ValueError):
+        SecondaryHeader.frombytes(bytes(data[PHSIZE : PHSIZE + SHSIZE]))
+    with pytest.raises(ValueError):
+        make_decoder(SecondaryHeader)(data, PHSIZE)
+
+
+@pytest.mark.parametrize(
+    "descriptor",
+    [
+        obj
+        for obj in vars(s1isp.descriptors).values()
+        if bpack.is_descriptor(obj)
+    ],
+)
+def test_fast_decode(descriptor):
+    rng = random.Random(0)
+    size = descriptor._BPACK_SIZE_BYTES
+    for _ in range(20):
+        data = bytes(rng.getrandbits(8) for _ in range(size))
+        try:
+            expected = descriptor.frombytes(data)
+        except ValueError:
+            with pytest.raises(ValueError):
+                descriptor._fast_decode(data)
+        else:
+            # compare repr since random floats can be NaN
+            assert repr(descriptor._fast_decode(data)) == repr(expected)
@@ -0,0 +1,145 @@
+"""Tests for ISP stream decoding."""
+
+import pytest
+from numpy import testing as npt
+
+from s1isp.decoder import (
+    SubCommItem,
+    EUdfDecodingMode,
+    TruncatedISPError,
+    scan_stream,
+    decode_stream,
+)
+from s1isp.constants import PRIMARY_HEADER_SIZE as PHSIZE
+
+
+def test_decode_stream(stream_file, noise_ref_data, echo_ref_data):
+    records, offsets, subcom_data_records = decode_stream(stream_file)
+
+    assert len(records) == 3
+    assert len(offsets) == len(records) + 1
+    assert offsets[0] == 0
+    assert offsets[-1] == stream_file.stat().st_size
+    assert records[0].primary_header == noise_ref_data["primary_header"]
+    assert records[0].secondary_header == noise_ref_data["secondary_header"]
+    assert records[-1].primary_header == echo_ref_data["primary_header"]
+    assert records[-1].secondary_header == echo_ref_data["secondary_header"]
+    assert all(record.udf is None for record in records)
+
+    assert len(subcom_data_records) == len(records)
+    assert all(isinstance(item, SubCommItem) for item in subcom_data_records)
+
+
+def test_decode_stream_no_subcomm(stream_file):
+    records, _, subcom_data_records = decode_stream(
+        stream_file, collect_subcomm=False
+    )
+    assert len(records) == 3
+    assert subcom_data_records == []
+
+
+@pytest.mark.parametrize(
+    "skip, maxcount", [(None, None), (1, None), (None, 2), (1, 1)]
+)
+def test_scan_stream(stream_file, skip, maxcount):
+    _, offsets, _ = decode_stream(stream_file, skip=skip, maxcount=maxcount)
+    assert scan_stream(stream_file, skip=skip, maxcount=maxcount) == offsets
+
+
+@pytest.mark.parametrize("nprocs", [None, 2])
+@pytest.mark.parametrize(
+    "udf_decoding_mode",
+    [
+        EUdfDecodingMode.NONE,
+        EUdfDecodingMode.EXTRACT,
+        EUdfDecodingMode.DECODE,
+    ],
+)
+@pytest.mark.parametrize("size", [-10, 3, PHSIZE + 3])
+def test_decode_stream_truncated(
+    tmp_path, stream_file, size, udf_decoding_mode, nprocs
+):
+    offsets = scan_stream(stream_file)
+    data = stream_file.read_bytes()
+    # truncate the last ISP
+    size = size if size < 0 else offsets[-2] + size
+    filename = tmp_path / "truncated.dat"
+    filename.write_bytes(data[:size])
+
+    kwargs = dict(udf_decoding_mode=udf_decoding_mode, nprocs=nprocs)
+    with pytest.raises(TruncatedISPError, match=f"offset {offsets[-2]}"):
+        decode_stream(filename, **kwargs)
+    with pytest.raises(TruncatedISPError, match=f"offset {offsets[-2]}"):
+        decode_stream(filename, skip=1, **kwargs)
+    with pytest.raises(TruncatedISPError):
+        scan_stream(filename)
+
+    # the truncated ISP is not reached
+    records, poffsets, _ = decode_stream(filename, maxcount=2, **kwargs)
+    assert len(records) == 2
+    assert poffsets == offsets[:-1]
+    assert scan_stream(filename, maxcount=2) == offsets[:-1]
+
+
+def test_scan_stream_bad_primary_header(tmp_path, stream_file):
+    offsets = scan_stream(stream_file)
+    data = bytearray(stream_file.read_bytes())
+    data[offsets[1]] |= 0xE0  # invalid packet version number
+    filename = tmp_path / "corrupted.dat"
+    filename.write_bytes(data)
+
+    with pytest.raises(AssertionError):
+        decode_stream(filename, skip=2)
+    with pytest.raises(AssertionError):
+        scan_stream(filename, skip=2)
+    with pytest.raises(AssertionError):
+        decode_stream(filename, skip=2, nprocs=2)
+
+
+@pytest.mark.parametrize("skip", [None, 1])
+@pytest.mark.parametrize(
+    "udf_decoding_mode",
+    [
+        EUdfDecodingMode.NONE,
+        EUdfDecodingMode.EXTRACT,
+        EUdfDecodingMode.DECODE,
+    ],
+)
+def test_decode_stream_parallel(stream_file, udf_decoding_mode, skip):
+    kwargs = dict(skip=skip, udf_decoding_mode=udf_decoding_mode)
+    records, offsets, subcom_data_records = decode_stream(
+        stream_file, **kwargs
+    )
+    precords, poffsets, psubcom_data_records = decode_stream(
+        stream_file, nprocs=2, **kwargs
+    )
+    assert len(precords) == len(records)
+    for precord, record in zip(precords, records):
+        assert precord.primary_header == record.primary_header
+        assert precord.secondary_header == record.secondary_header
+        if udf_decoding_mode is EUdfDecodingMode.DECODE:
+            npt.assert_array_equal(precord.udf, record.udf)
+        else:
+            assert precord.udf == record.udf
+    assert poffsets == offsets
+    assert psubcom_data_records == subcom_data_records
+
+
+@pytest.mark.parametrize("skip", [None, 1])
+def test_decode_stream_parallel_bytes_offset(stream_file, skip):
+    offsets = scan_stream(stream_file)
+    kwargs = dict(
+        skip=skip,
+        bytes_offset=offsets[1],
+        udf_decoding_mode=EUdfDecodingMode.EXTRACT,
+    )
+    records, offsets, subcom_data_records = decode_stream(
+        stream_file, **kwargs
+    )
+    precords, poffsets, psubcom_data_records = decode_stream(
+        stream_file, nprocs=2, **kwargs
+    )
+    assert len(records) == (1 if skip else 2)
+    assert precords == records
+    assert poffsets == offsets
+    assert psubcom_data_records == subcom_data_records
@@ -1,41 +1,65 @@
 """Tests for ISP headers decoding."""
 
+import sys
+import pickle
+import dataclasses
 from fractions import Fraction
 
+import numpy as np
 import pytest
 from numpy import testing as npt
 
-from s1isp.enums import ESignalType
+from s1isp.enums import ESignalType, ERangeDecimation
 from s1isp.constants import PRIMARY_HEADER_SIZE as PHSIZE
 from s1isp.constants import SECONDARY_HEADER_SIZE as SHSIZE
 from s1isp.descriptors import (
     SasCalData,
     SasImgData,
+    SasCalDataRaw,
+    SasImgDataRaw,
+    PacketHeader,
     PrimaryHeader,
     SecondaryHeader,
     RangeDecimationInfo,
+    HKTemperatureAncillaryData,
+    RadarConfigurationSupportService,
 )
 
 
-def test_txcal(txcal_data, txcal_ref_data):
-    phdata = txcal_data[:PHSIZE]
-    shdata = txcal_data[PHSIZE : PHSIZE + SHSIZE]
+@pytest.fixture(
+    params=[
+        ("txcal", ESignalType.TX_CAL),
+        ("noise", ESignalType.NOISE),
+        ("echo", ESignalType.ECHO),
+    ],
+    ids=lambda param: param[0],
+)
+def isp_data(request):
+    kind, signal_type = request.param
+    data = request.getfixturevalue(f"{kind}_data")
+    ref_data = request.getfixturevalue(f"{kind}_ref_data")
+    return data, ref_data, signal_type
+
+
+def test_headers(isp_data):
+    data, ref_data, signal_type = isp_data
+    phdata = data[:PHSIZE]
+    shdata = data[PHSIZE : PHSIZE + SHSIZE]
 
     primary_header = PrimaryHeader.frombytes(phdata)
-    assert primary_header == txcal_ref_data["primary_header"]
+    assert primary_header == ref_data["primary_header"]
 
     secondary_header = SecondaryHeader.frombytes(shdata)
-    assert secondary_header == txcal_ref_data["secondary_header"]
+    assert secondary_header == ref_data["secondary_header"]
 
-    assert primary_header.packet_data_length + 1 == len(txcal_data) - PHSIZE
+    assert primary_header.packet_data_length + 1 == len(data) - PHSIZE
 
     rcss = secondary_header.radar_configuration_support
-    assert rcss.ses.signal_type == ESignalType.TX_CAL
+    assert rcss.ses.signal_type == signal_type
 
 
-def test_cal_sas(txcal_data, txcal_ref_data):
-    shdata = txcal_data[PHSIZE : PHSIZE + SHSIZE]
-    secondary_header = SecondaryHeader.frombytes(shdata)
+def test_cal_sas(txcal_secondary_header, txcal_ref_data):
+    secondary_header = txcal_secondary_header
 
     rcss = secondary_header.radar_configuration_support
     cal_sas = rcss.sas.get_sas_data()
@@ -64,26 +88,18 @@ def test_cal_sas(txcal_data, txcal_ref_data):
         rcss.sas.get_azimuth_beam_address(check=False) == ref_cal_beam_address
     )
 
-
-def test_noise(noise_data, noise_ref_data):
-    phdata = noise_data[:PHSIZE]
-    shdata = noise_data[PHSIZE : PHSIZE + SHSIZE]
-
-    primary_header = PrimaryHeader.frombytes(phdata)
-    assert primary_header == noise_ref_data["primary_header"]
-
-    secondary_header = SecondaryHeader.frombytes(shdata)
-    assert secondary_header == noise_ref_data["secondary_header"]
-
-    assert primary_header.packet_data_length + 1 == len(noise_data) - PHSIZE
-
-    rcss = secondary_header.radar_configuration_support
-    assert rcss.ses.signal_type == ESignalType.NOISE
+    raw = rcss.sas.get_sas_data_raw()
+    assert isinstance(raw, SasCalDataRaw)
+    assert raw._asdict() == {
+        field.name: getattr(cal_sas, field.name)
+        for field in dataclasses.fields(cal_sas)
+    }
+    assert raw.calibration_beam_address == ref_cal_beam_address
+    assert all(type(item) is int for item in raw)
 
 
-def test_noise_sas(noise_data, noise_ref_data):
-    shdata = noise_data[PHSIZE : PHSIZE + SHSIZE]
-    secondary_header = SecondaryHeader.frombytes(shdata)
+def test_noise_sas(noise_secondary_header, noise_ref_data):
+    secondary_header = noise_secondary_header
 
     rcss = secondary_header.radar_configuration_support
 
@@ -116,26 +132,19 @@ def test_noise_sas(noise_data, noise_ref_data):
     sas = rcss.sas
     assert sas.get_calibration_beam_address(check=False) == ref_az_beam_address
 
-
-def test_echo(echo_data, echo_ref_data):
-    phdata = echo_data[:PHSIZE]
-    shdata = echo_data[PHSIZE : PHSIZE + SHSIZE]
-
-    primary_header = PrimaryHeader.frombytes(phdata)
-    assert primary_header == echo_ref_data["primary_header"]
-
-    secondary_header = SecondaryHeader.frombytes(shdata)
-    assert secondary_header == echo_ref_data["secondary_header"]
-
-    assert primary_header.packet_data_length + 1 == len(echo_data) - PHSIZE
-
-    rcss = secondary_header.radar_configuration_support
-    assert rcss.ses.signal_type == ESignalType.ECHO
+    raw = rcss.sas.get_sas_data_raw()
+    assert isinstance(raw, SasImgDataRaw)
+    assert raw._asdict() == {
+        field.name: getattr(cal_sas, field.name)
+        for field in dataclasses.fields(cal_sas)
+    }
+    assert raw.elevation_beam_address == ref_el_beam_address
+    assert raw.azimuth_beam_address == ref_az_beam_address
+    assert all(type(item) is int for item in raw)
 
 
-def test_echo_sas(echo_data, echo_ref_data):
-    shdata = echo_data[PHSIZE : PHSIZE + SHSIZE]
-    secondary_header = SecondaryHeader.frombytes(shdata)
+def test_echo_sas(echo_secondary_header, echo_ref_data):
+    secondary_header = echo_secondary_header
 
     rcss = secondary_header.radar_configuration_support
     cal_sas = rcss.sas.get_sas_data()
@@ -168,9 +177,8 @@ def test_echo_sas(echo_data, echo_ref_data):
     assert sas.get_calibration_beam_address(check=False) == ref_az_beam_address
 
 
-def test_echo_datation_service(echo_data, echo_ref_data):
-    shdata = echo_data[PHSIZE : PHSIZE + SHSIZE]
-    secondary_header = SecondaryHeader.frombytes(shdata)
+def test_echo_datation_service(echo_secondary_header, echo_ref_data):
+    secondary_header = echo_secondary_header
 
     ds = secondary_header.datation
     ref = echo_ref_data["secondary_header"].datation
@@ -179,56 +187,114 @@ def test_echo_datation_service(echo_data, echo_ref_data):
     npt.assert_allclose(ds.get_fine_time_sec(), 0.9439621)
 
 
-def test_echo_radar_configuration_support_service(echo_data, echo_ref_data):
-    shdata = echo_data[PHSIZE : PHSIZE + SHSIZE]
-    secondary_header = SecondaryHeader.frombytes(shdata)
+def test_echo_radar_configuration_support_service(
+    echo_secondary_header, echo_ref_data
+):
+    secondary_header = echo_secondary_header
 
     rcss = secondary_header.radar_configuration_support
     ref = echo_ref_data["secondary_header"].radar_configuration_support
 
-    assert rcss.get_baq_block_len_samples() == ref.get_baq_block_len_samples()
-    assert rcss.get_range_decimation_info() == ref.get_range_decimation_info()
-    assert rcss.get_rx_gain_db() == ref.get_rx_gain_db()
-    assert (
-        rcss.get_tx_ramp_rate_hz_per_sec() == ref.get_tx_ramp_rate_hz_per_sec()
+    getters = [
+        "get_baq_block_len_samples",
+        "get_range_decimation_info",
+        "get_rx_gain_db",
+        "get_tx_ramp_rate_hz_per_sec",
+        "get_tx_pulse_start_freq_hz",
+        "get_tx_pulse_length_sec",
+        "get_tx_pulse_length_samples",
+        "get_pri_sec",
+        "get_swst_sec",
+        "get_delta_t_suppr_sec",
+        "get_swst_after_decimation_sec",
+        "get_swl_sec",
+        "get_swl_n3rx_samples",
+        "get_swl_n3rx_sec",
+    ]
+    values = {name: getattr(rcss, name)() for name in getters}
+    assert values == {name: getattr(ref, name)() for name in getters}
+
+    npt.assert_allclose(values["get_rx_gain_db"], -6.0)
+    npt.assert_allclose(
+        values["get_tx_ramp_rate_hz_per_sec"], 1344932774550.9954
     )
-    assert (
-        rcss.get_tx_pulse_start_freq_hz() == ref.get_tx_pulse_start_freq_hz()
+    npt.assert_allclose(
+        values["get_tx_pulse_start_freq_hz"], -29704503.224123612
     )
-    assert rcss.get_tx_pulse_length_sec() == ref.get_tx_pulse_length_sec()
-    assert (
-        rcss.get_tx_pulse_length_samples() == ref.get_tx_pulse_length_samples()
+    npt.assert_allclose(
+        values["get_tx_pulse_length_sec"], 4.4172432911548294e-05
     )
-    assert rcss.get_pri_sec() == ref.get_pri_sec()
-    assert rcss.get_swst_sec() == ref.get_swst_sec()
-    assert rcss.get_delta_t_suppr_sec() == ref.get_delta_t_suppr_sec()
-    assert (
-        rcss.get_swst_after_decimation_sec()
-        == ref.get_swst_after_decimation_sec()
+    npt.assert_allclose(values["get_pri_sec"], 0.0005194923216780943)
+    npt.assert_allclose(values["get_swst_sec"], 0.00014042997218140596)
+    npt.assert_allclose(
+        values["get_delta_t_suppr_sec"], 1.0656799254897057e-06
     )
-    assert rcss.get_swl_sec() == ref.get_swl_sec()
-    assert rcss.get_swl_n3rx_samples() == ref.get_swl_n3rx_samples()
-    assert rcss.get_swl_n3rx_sec() == ref.get_swl_n3rx_sec()
-
-    npt.assert_allclose(rcss.get_rx_gain_db(), -6.0)
-    npt.assert_allclose(rcss.get_tx_ramp_rate_hz_per_sec(), 1344932774550.9954)
-    npt.assert_allclose(rcss.get_tx_pulse_start_freq_hz(), -29704503.224123612)
-    npt.assert_allclose(rcss.get_tx_pulse_length_sec(), 4.4172432911548294e-05)
-    npt.assert_allclose(rcss.get_pri_sec(), 0.0005194923216780943)
-    npt.assert_allclose(rcss.get_swst_sec(), 0.00014042997218140596)
-    npt.assert_allclose(rcss.get_delta_t_suppr_sec(), 1.0656799254897057e-06)
     npt.assert_allclose(
-        rcss.get_swst_after_decimation_sec(), 0.00014149565210689566
+        values["get_swst_after_decimation_sec"], 0.00014149565210689566
     )
-    npt.assert_allclose(rcss.get_swl_sec(), 0.0003244462533153409)
-    npt.assert_allclose(rcss.get_swl_n3rx_sec(), 0.0003230708601615057)
+    npt.assert_allclose(values["get_swl_sec"], 0.0003244462533153409)
+    npt.assert_allclose(values["get_swl_n3rx_sec"], 0.0003230708601615057)
 
-    assert rcss.get_baq_block_len_samples() == 256
-    assert rcss.get_range_decimation_info() == RangeDecimationInfo(
+    assert values["get_baq_block_len_samples"] == 256
+    assert values["get_range_decimation_info"] == RangeDecimationInfo(
         decimation_filer_band=59440000.0,
         decimation_ratio=Fraction(4, 9),
         filter_length=40,
         swaths=["S3"],
     )
-    assert rcss.get_tx_pulse_length_samples() == 2948
-    assert rcss.get_swl_n3rx_samples() == 21558
+    assert values["get_tx_pulse_length_samples"] == 2948
+    assert values["get_swl_n3rx_samples"] == 21558
+
+
+def test_hk_tile_temperatures():
+    values = {
+        f"tile{tile}_{item}_temperature": 3 * (tile - 1) + idx
+        for tile in range(1, 15)
+        for idx, item in enumerate(["efeh", "efev", "ta"])
+    }
+    hk = HKTemperatureAncillaryData(**values)
+    tiles = hk.get_tile_temperatures()
+    assert tiles.shape == (14, 3)
+    assert tiles.dtype == np.uint8
+    npt.assert_array_equal(tiles.ravel(), np.arange(42))
+    assert tiles[3, 2] == hk.tile4_ta_temperature
+
+
+def test_tx_pulse_length_samples_exact():
+    # 351 * 4 * 5 / 9 == 780 exactly (the float computation gives 781)
+    rcss = RadarConfigurationSupportService(
+        range_decimation=ERangeDecimation.X5_ON_9, tx_pulse_length=351
+    )
+    assert rcss.get_tx_pulse_length_samples() == 780
+
+
+def test_swl_n3rx_samples_short_swl():
+    # B = 2 * 11 - 87 - 17 = -82 is truncated: B / 4 -> -20, C = -2
+    rcss = RadarConfigurationSupportService(
+        range_decimation=ERangeDecimation.X3_ON_4, swl=11
+    )
+    assert rcss.get_swl_n3rx_samples() == 2 * (3 * -20 + 2 + 1)
+
+
+def test_packet_header(echo_data, echo_ref_data):
+    header = PacketHeader.frombytes(echo_data[: PHSIZE + SHSIZE])
+    assert header.primary_header == echo_ref_data["primary_header"]
+    assert header.secondary_header == echo_ref_data["secondary_header"]
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 10), reason="dataclass slots requires py>=3.10"
+)
+def test_slots(echo_ref_data):
+    secondary_header = echo_ref_data["secondary_header"]
+    assert not hasattr(secondary_header, "__dict__")
+    data = pickle.dumps(secondary_header)
+    assert pickle.loads(data) == secondary_header
+
+
+def test_unpack_from(echo_data, echo_ref_data):
+    data = memoryview(echo_data)
+    primary_header = PrimaryHeader.unpack_from(data)
+    assert primary_header == echo_ref_data["primary_header"]
+    secondary_header = SecondaryHeader.unpack_from(data, PHSIZE)
+    assert secondary_header == echo_ref_data["secondary_header"]
@@ -1,5 +1,6 @@
 """Unit tests for Huffman decoding."""
 
+import functools
 import itertools
 from typing import Optional
 
@@ -119,73 +120,45 @@ HUFFMAN_CODES = {
 
 
 HCODE_LUTS = {
-    brc: np.fromiter(HUFFMAN_CODES[brc].values(), dtype=np.int8)
-    for brc in HUFFMAN_CODES
+    brc: np.array(list(codes.values()), dtype=np.int8)
+    for brc, codes in HUFFMAN_CODES.items()
 }
 
 
+@functools.lru_cache(maxsize=None)
 def get_huffman_data(brc: int, nsamples: Optional[int] = None):
     codes = list(HUFFMAN_CODES[brc].keys())
     values = list(HUFFMAN_CODES[brc].values())
 
-    ncodes = len(codes)
     if nsamples is None:
-        nsamples = ncodes
-        factor = 1
-    else:
-        factor = int(np.ceil(nsamples / ncodes))
+        nsamples = len(codes)
 
-    bits = (codes * factor)[:nsamples]
-    values = (values * factor)[:nsamples]
+    bits = itertools.islice(itertools.cycle(codes), nsamples)
+    values = itertools.islice(itertools.cycle(values), nsamples)
 
     bits = np.fromiter(itertools.chain.from_iterable(bits), dtype=np.uint8)
+    bits.flags.writeable = False  # cached: shared by all callers
 
-    return bits, values
+    return bits, tuple(values)
 
 
 @pytest.mark.parametrize("brc", [0, 1, 2, 3, 4])
-def test_huffman_decode(brc):
+@pytest.mark.parametrize(
+    "use_out, use_count",
+    [(False, False), (False, True), (True, False), (True, True)],
+    ids=["default", "count", "outbuf", "outbuf_and_count"],
+)
+def test_huffman_decode(brc, use_out, use_count):
     bits, values = get_huffman_data(brc)
     nsamples = len(values)
-    out = huffman.decode(bits, nsamples, brc)
-    lut = HCODE_LUTS[brc]
-    outvalues = lut[out]
-    np.testing.assert_array_equal(values, outvalues)
-
-
-@pytest.mark.parametrize("brc", [0, 1, 2, 3, 4])
-def test_huffman_decode_with_count(brc):
-    bits, values = get_huffman_data(brc)
-    nsamples = len(values)
-    out, count = huffman.decode(bits, nsamples, brc, count=True)
-    assert count == len(bits)
-    lut = HCODE_LUTS[brc]
-    outvalues = lut[out]
-    np.testing.assert_array_equal(values, outvalues)
-
-
-@pytest.mark.parametrize("brc", [0, 1, 2, 3, 4])
-def test_huffman_decode_with_outbuf(brc):
-    bits, values = get_huffman_data(brc)
-    nsamples = len(values)
-    buf = np.zeros(nsamples, dtype=np.uint8)
-    out = huffman.decode(bits, nsamples, brc, out=buf)
-    np.testing.assert_array_equal(out, buf)
-    # assert out.data is buf.data  # TODO: check
-    lut = HCODE_LUTS[brc]
-    outvalues = lut[out]
-    np.testing.assert_array_equal(values, outvalues)
-
-
-@pytest.mark.parametrize("brc", [0, 1, 2, 3, 4])
-def test_huffman_decode_with_outbuf_and_count(brc):
-    bits, values = get_huffman_data(brc)
-    nsamples = len(values)
-    buf = np.zeros(nsamples, dtype=np.uint8)
-    out, count = huffman.decode(bits, nsamples, brc, out=buf, count=True)
-    assert count == len(bits)
-    np.testing.assert_array_equal(out, buf)
-    # assert out.data is buf.data  # TODO: check
+    buf = np.zeros(nsamples, dtype=np.uint8) if use_out else None
+    out = huffman.decode(bits, nsamples, brc, out=buf, count=use_count)
+    if use_count:
+        out, count = out
+        assert count == len(bits)
+    if use_out:
+        np.testing.assert_array_equal(out, buf)
+        assert np.shares_memory(out, buf)
     lut = HCODE_LUTS[brc]
     outvalues = lut[out]
     np.testing.assert_array_equal(values, outvalues)
@@ -205,7 +178,7 @@ def test_huffman_decode_cycle_to_128(brc):
 def test_huffman_decode_partial(brc):
     bits, values = get_huffman_data(brc, nsamples=NSAMPLES)
     nsamples = len(values)
-    bits = np.resize(bits, bits.size * 2)
+    bits = np.concatenate([bits, np.zeros_like(bits)])  # trailing data
     out = huffman.decode(bits, nsamples, brc)
     lut = HCODE_LUTS[brc]
     outvalues = lut[out]
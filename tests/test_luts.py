@@ -1,6 +1,22 @@
 """Tests for LUTs."""
 
-from s1isp.luts import BRC_SIZE, get_fdbaq_lut
+import numpy as np
+import pytest
+from numpy import testing as npt
+
+from s1isp.luts import (
+    BRC_SIZE,
+    SRM_LUT_A,
+    BAQ_NRL_LUT,
+    get_baq_lut,
+    SIGMA_FACTORS_LUT,
+    get_baq_lut_table,
+    get_fdbaq_lut,
+    get_fdbaq_lut_table,
+    lookup_filter_output_offset,
+    lookup_range_decimation_info,
+)
+from s1isp.enums import EBaqMode, EBrcCode, ERangeDecimation
 
 
 def test_fdbaq_econstruction_lut(fdbaq_reconstruction_lut):
@@ -10,11 +26,73 @@ def test_fdbaq_econstruction_lut(fdbaq_reconstruction_lut):
         for thidx, thidx_lut in brc_lut.items():
             thidx = int(thidx)
             lut = get_fdbaq_lut(brc, thidx, dtype="float64")
-            for ucode in range(2 * BRC_SIZE[brc]):
-                sign = 1 if ucode >= BRC_SIZE[brc] else 0
-                mcode = ucode - BRC_SIZE[brc] if sign else ucode
-                ref = thidx_lut[str(sign)][str(mcode)]
+            # ucode = sign * BRC_SIZE[brc] + mcode
+            ref = [
+                thidx_lut[str(sign)][str(mcode)]
+                for sign in (0, 1)
+                for mcode in range(BRC_SIZE[brc])
+            ]
+            npt.assert_allclose(lut, ref, rtol=0, atol=toll)
+
+
+def test_filter_output_offset():
+    # S1-IF-ASD-PL-0007, section 5.1: 80 + NF / 4
+    for rdcode in ERangeDecimation:
+        rdinfo = lookup_range_decimation_info(rdcode)
+        offset = 80 + rdinfo.filter_length // 4
+        assert lookup_filter_output_offset(rdcode) == offset
+
+
+def test_fdbaq_lut_table():
+    table = get_fdbaq_lut_table()
+    assert table.shape == (5, 256, 32)
+    for brc in EBrcCode:
+        for thidx in (0, 3, 100, 255):
+            lut = get_fdbaq_lut(brc, thidx)
+            assert (table[brc, thidx, : len(lut)] == lut).all()
+
+
+@pytest.mark.parametrize(
+    "baqmode, last_srm_thidx",
+    [(EBaqMode.BAQ3, 3), (EBaqMode.BAQ4, 5), (EBaqMode.BAQ5, 10)],
+)
+def test_baq_lut_thidx_boundary(baqmode, last_srm_thidx):
+    n = 2 ** (baqmode.value - 1)
+    assert len(SRM_LUT_A[baqmode]) == last_srm_thidx + 1
+
+    # simple reconstruction up to the last THIDX in SRM_LUT_A
+    for thidx in range(last_srm_thidx + 1):
+        lut = get_baq_lut(baqmode, thidx, dtype="float64")
+        assert lut.shape == (2 * n,)
+        npt.assert_array_equal(lut[: n - 1], np.arange(n - 1))
+        assert lut[n - 1] == SRM_LUT_A[baqmode][thidx]
+        npt.assert_array_equal(lut[n:], -lut[:n])
+
+    # normalized reconstruction levels above it (for BAQ4 and BAQ5 this
+    # includes THIDX values < 2**(nbits - 1) that used to raise IndexError)
+    for thidx in sorted(
+        {last_srm_thidx + 1, n - 1, n, 255} - {last_srm_thidx}
+    ):
+        lut = get_baq_lut(baqmode, thidx, dtype="float64")
+        ref = np.asarray(BAQ_NRL_LUT[baqmode]) * SIGMA_FACTORS_LUT[thidx]
+        npt.assert_array_equal(lut[:n], ref)
+        npt.assert_array_equal(lut[n:], -ref)
+
+
+def test_baq_lut_invalid():
+    with pytest.raises(ValueError):
+        get_baq_lut(EBaqMode.BYPASS, 0)
+    with pytest.raises(ValueError):
+        get_baq_lut(EBaqMode.BAQ3, 256)
 
-                val = lut[ucode]
 
-                assert abs(ref - val) < toll
+@pytest.mark.parametrize(
+    "baqmode", [EBaqMode.BAQ3, EBaqMode.BAQ4, EBaqMode.BAQ5]
+)
+def test_baq_lut_table(baqmode):
+    table = get_baq_lut_table(baqmode)
+    assert table.shape == (256, 2**baqmode.value)
+    assert table.dtype == np.float32
+    assert not table.flags.writeable
+    for thidx in range(256):
+        npt.assert_array_equal(table[thidx], get_baq_lut(baqmode, thidx))
@@ -1,34 +1,61 @@
 """Tests for ISP user data field decoding."""
 
+import functools
+
 import numpy as np
-import bitstruct as bs
+import pytest
+import bpack.np
+from numpy import testing as npt
 from test_huffman import get_huffman_data, BRC, HCODE_LUTS, HUFFMAN_CODES
 from test_huffman import NSAMPLES as BLOCKSIZE
 
-from s1isp.udf import align_quads, bypass_decode, huffman_decode, decode_ud
-from s1isp.enums import ESignalType
+from s1isp import bulk, _udf
+from s1isp import _huffman as huffman
+from s1isp.udf import (
+    align_quads,
+    _reconstruct,
+    baq_decode,
+    bypass_decode,
+    huffman_decode,
+    decode_ud,
+    EDataFormatType,
+    decode_ud_batch,
+    get_data_format_type,
+)
+from s1isp.luts import SRM_LUT_A, get_baq_lut
+from s1isp.enums import EBaqMode, ETestMode, ESignalType
+from s1isp.decoder import scan_stream
 from s1isp.constants import PRIMARY_HEADER_SIZE as PHSIZE
 from s1isp.constants import SECONDARY_HEADER_SIZE as SHSIZE
-from s1isp.descriptors import SecondaryHeader
+
+HCODE_TABLE = np.zeros(
+    (len(HCODE_LUTS), max(len(lut) for lut in HCODE_LUTS.values())),
+    dtype=np.int8,
+)
+for _brc, _lut in HCODE_LUTS.items():
+    HCODE_TABLE[_brc, : len(_lut)] = _lut
 
 
-def make_quats(nq: int = 100):
-    n_cpx_samples = 2 * nq
-    n_flt_smaples = 2 * n_cpx_samples
-    fdata = np.arange(n_flt_smaples, dtype=np.float32)
-    cdata = np.frombuffer(fdata.data, dtype=np.complex64)
+def make_quats(nq: int = 100, contiguous: bool = True):
+    fdata = np.arange(4 * nq, dtype=np.float32)
+    cdata = fdata.view(np.complex64)
 
-    ie = fdata[0::4]
-    io = fdata[2::4]
-    qe = fdata[1::4]
-    qo = fdata[3::4]
+    if contiguous:
+        quads = np.arange(0, 4 * nq, 4, dtype=np.float32)
+        ie, qe, io, qo = (quads + offset for offset in range(4))
+    else:
+        ie = fdata[0::4]
+        io = fdata[2::4]
+        qe = fdata[1::4]
+        qo = fdata[3::4]
 
     return cdata, ie, io, qe, qo
 
 
-def test_align_quads(nq: int = 100):
-    cdata, ie, io, qe, qo = make_quats(nq)
-    out = align_quads(ie, io, qe, qo)
+@pytest.mark.parametrize("contiguous", [False, True])
+def test_align_quads(contiguous, nq: int = 100):
+    cdata, *channels = make_quats(nq, contiguous)
+    out = align_quads(*channels)
     np.testing.assert_array_equal(out, cdata)
 
 
@@ -56,37 +83,46 @@ def make_bypass(nbits: int = 10):
     n_flt_smaples = 2**10
     nq = n_flt_smaples // 4
 
-    fdata = np.zeros(n_flt_smaples, dtype=np.float32)
+    cdata = np.zeros(n_flt_smaples // 2, dtype=np.complex64)
+    fdata = cdata.view(np.float32)  # interleaved (real, imag) samples
     fdata[: 2 ** (nbits - 1)] = np.arange(2 ** (nbits - 1))
     fdata[2 ** (nbits - 1) :] = -fdata[: 2 ** (nbits - 1)]
-    cdata = np.frombuffer(fdata.data, dtype=np.complex64)
     idata = np.arange(n_flt_smaples, dtype=np.int16)
 
     ie = idata[0::4]
     io = idata[2::4]
     qe = idata[1::4]
     qo = idata[3::4]
-    nwords = int(np.ceil((nq * nbits) / 16))
+    nwords = (nq * nbits + 15) // 16
     pad = nwords * 16 - nq * nbits
 
-    if pad:
-        fmt = f">{'u10'*nq}p{pad}"
-    else:
-        fmt = f">{'u10'*nq}"
-
-    data = b"".join([bs.pack(fmt, *seq) for seq in [ie, io, qe, qo]])
+    # MSB first bits of each sample, channel padded to 16 bits words
+    shifts = np.arange(nbits - 1, -1, -1)
+    data = b"".join(
+        np.packbits(
+            np.concatenate(
+                [((seq[:, None] >> shifts) & 1).ravel(), np.zeros(pad, int)]
+            )
+        ).tobytes()
+        for seq in [ie, io, qe, qo]
+    )
 
     return cdata, data, nq
 
 
-def test_bypass_decode(nbits=10):
-    cdata, data, nq = make_bypass(nbits)
+@pytest.fixture(scope="module")
+def bypass_data():
+    return make_bypass(nbits=10)
+
+
+def test_bypass_decode(bypass_data):
+    cdata, data, nq = bypass_data
     out = bypass_decode(data, nq)
     np.testing.assert_array_equal(out, cdata)
 
 
-def test_bypass_decode_out(nbits=10):
-    cdata, data, nq = make_bypass(nbits)
+def test_bypass_decode_out(bypass_data):
+    cdata, data, nq = bypass_data
     buf = np.zeros_like(cdata)
     out = bypass_decode(data, nq, out=buf)
     np.testing.assert_array_equal(out, cdata)
@@ -94,6 +130,15 @@ def test_bypass_decode_out(nbits=10):
     assert buf is out
 
 
+@functools.lru_cache(maxsize=8)
+def get_thidx_bits(blocksize: int, nblocks: int):
+    thidx = np.arange(blocksize, blocksize + nblocks, dtype=np.uint8)
+    thidx_bits = np.unpackbits(thidx[:, None], axis=1)
+    thidx.flags.writeable = False  # cached: shared by all callers
+    thidx_bits.flags.writeable = False
+    return thidx, thidx_bits
+
+
 def get_fdbaq_channel(
     blocksize: int = BLOCKSIZE, samples: int = None, header=False
 ):
@@ -101,30 +146,27 @@ def get_fdbaq_channel(
     if samples is None:
         samples = nblocks * blocksize
     if header == "thidx":
-        thidx = np.arange(blocksize, blocksize + nblocks, dtype=np.uint8)
-        thidx_bits = np.unpackbits(thidx[:, None], axis=1)
+        thidx, thidx_bits = get_thidx_bits(blocksize, nblocks)
     else:
         thidx = None
 
     brcs = []
-    bits = []
+    chunks = []
     values = []
     for bidx, brc in enumerate(HUFFMAN_CODES):
         brcs.append(brc)
         if header == "thidx":
-            bits.extend(thidx_bits[bidx])
+            chunks.append(thidx_bits[bidx])
         elif header:
-            bits.extend(BRC[brc])
+            chunks.append(np.array(BRC[brc], dtype=np.uint8))
 
         bits_seq, val_seq = get_huffman_data(brc, blocksize)
-        bits.extend(bits_seq.tolist())
+        chunks.append(bits_seq)
         values.extend(val_seq)
 
-    nbits = len(bits)
-    nwords = int(np.ceil(nbits / 16))
-    pad = nwords * 16 - nbits
-    bits.extend([0] * pad)
-    nbits = len(bits)
+    bits = np.concatenate(chunks)
+    pad = -len(bits) % 16
+    bits = np.pad(bits, (0, pad))
     assert len(bits) % 16 == 0
 
     return bits, values, brcs, thidx, pad
@@ -142,15 +184,26 @@ def get_fdbaq_stream(blocksize):
 
     assert ie_pad + io_pad + qe_pad + qo_pad > 1
 
-    bits = np.asarray(ie_bits + io_bits + qe_bits + qo_bits, dtype=np.uint8)
-    outsize = int(np.ceil(len(bits) / (4 * 8))) * (4 * 8)
-    bits = np.resize(bits, outsize)
+    channels = [ie_bits, io_bits, qe_bits, qo_bits]
+    nbits = sum(len(channel_bits) for channel_bits in channels)
+    bits = np.zeros(-(-nbits // 32) * 32, dtype=np.uint8)
+    offset = 0
+    for channel_bits in channels:
+        bits[offset : offset + len(channel_bits)] = channel_bits
+        offset += len(channel_bits)
 
     return bits, [ie_values, io_values, qe_values, qo_values], brcs, thidx
 
 
-def test_huffman_decode(blocksize=BLOCKSIZE):
-    bits, values, brcs, thidx = get_fdbaq_stream(blocksize)
+@pytest.fixture(scope="module")
+def fdbaq_stream():
+    bits, values, brcs, thidx = get_fdbaq_stream(BLOCKSIZE)
+    bits.flags.writeable = False  # shared by all the tests in the module
+    return bits, values, brcs, thidx
+
+
+def test_huffman_decode(fdbaq_stream, blocksize=BLOCKSIZE):
+    bits, values, brcs, thidx = fdbaq_stream
     ie_values, io_values, qe_values, qo_values = values
     assert len(ie_values) == len(io_values) == len(qe_values) == len(qo_values)
     nq = len(ie_values)
@@ -162,56 +215,173 @@ def test_huffman_decode(blocksize=BLOCKSIZE):
     np.testing.assert_array_equal(brcs, brc_data)
     np.testing.assert_array_equal(thidx, thidx_data)
 
-    ie_hcodes = np.zeros(nq, dtype=np.int8)
-    io_hcodes = np.zeros(nq, dtype=np.int8)
-    qe_hcodes = np.zeros(nq, dtype=np.int8)
-    qo_hcodes = np.zeros(nq, dtype=np.int8)
-    for bidx, brc_value in enumerate(brc_data):
-        i0 = bidx * blocksize
-        i1 = min(i0 + blocksize, nq)
-        lut = HCODE_LUTS[brc_value]
-        ie_hcodes[i0:i1] = lut[ie[i0:i1]]
-        io_hcodes[i0:i1] = lut[io[i0:i1]]
-        qe_hcodes[i0:i1] = lut[qe[i0:i1]]
-        qo_hcodes[i0:i1] = lut[qo[i0:i1]]
-
-    np.testing.assert_array_equal(ie_hcodes, ie_values)
-    np.testing.assert_array_equal(io_hcodes, io_values)
-    np.testing.assert_array_equal(qe_hcodes, qe_values)
-    np.testing.assert_array_equal(qo_hcodes, qo_values)
-
-
-def test_decode_txcal(txcal_data, txcal_ref_data):
-    shdata = txcal_data[PHSIZE : PHSIZE + SHSIZE]
-    secondary_header = SecondaryHeader.frombytes(shdata)
-
-    rcss = secondary_header.radar_configuration_support
-    assert rcss.ses.signal_type == ESignalType.TX_CAL
-
-    nq = secondary_header.radar_sample_count.number_of_quads
-    baqmod = rcss.baq_mode
-    tstmod = secondary_header.fixed_ancillary_data.test_mode
-    data = decode_ud(txcal_data[PHSIZE + SHSIZE :], nq, baqmod, tstmod)
-    np.testing.assert_array_equal(data, txcal_ref_data["udf"])
+    # one LUT row per sample
+    sample_brc = np.repeat(brc_data, blocksize)[:nq]
+    codes = np.stack([ie, io, qe, qo])
+    np.testing.assert_array_equal(HCODE_TABLE[sample_brc, codes], values)
+
+
+@pytest.mark.parametrize("nq", [1, 7, 8, 1517])
+def test_bypass_decode_random(nq):
+    nbytes = 2 * ((10 * nq + 15) // 16)
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, 256, size=4 * nbytes, dtype=np.uint8).tobytes()
+    ie, io, qe, qo = (
+        bpack.np.unpackbits(
+            data[idx * nbytes : (idx + 1) * nbytes],
+            bits_per_sample=10,
+            sign_mode=bpack.np.ESignMode.SIGN_AND_MOD,
+        )
+        for idx in range(4)
+    )
+    expected = align_quads(ie, io, qe, qo, nq)
 
+    out = bypass_decode(data, nq)
+    assert out.dtype == np.complex64
+    npt.assert_array_equal(out, expected)
+
+    out = np.zeros(2 * nq, dtype=np.complex128)
+    bypass_decode(data, nq, out=out)
+    npt.assert_array_equal(out, expected)
+
+    with pytest.raises(ValueError):
+        bypass_decode(data[:-1], nq)
+
+
+def make_baq(nq, baqmod, blocksize=BLOCKSIZE, seed=0):
+    """Pack random BAQ sample codes and THIDX values (data format C)."""
+    rng = np.random.default_rng(seed)
+    nbits = baqmod.value
+    nb = -(-nq // blocksize)
+    codes = rng.integers(0, 2**nbits, size=(4, nq), dtype=np.uint8)
+    thidx = rng.integers(0, 256, size=nb, dtype=np.uint8)
+    # THIDX values around the SRM_LUT_A / BAQ_NRL_LUT switch
+    nsrm = len(SRM_LUT_A[baqmod])
+    thidx[:4] = [0, nsrm - 1, nsrm, 255][:nb]
+
+    shifts = np.arange(nbits - 1, -1, -1)
+
+    def tobits(values, width=nbits):
+        return ((values[:, None] >> shifts[-width:]) & 1).ravel()
+
+    def pack(bits):
+        return np.packbits(np.pad(bits, (0, -len(bits) % 16))).tobytes()
+
+    ie, io, qe, qo = codes
+    qe_bits = np.concatenate(
+        [
+            np.concatenate(
+                [
+                    np.unpackbits(thidx[bidx : bidx + 1]),
+                    tobits(qe[bidx * blocksize : (bidx + 1) * blocksize]),
+                ]
+            )
+            for bidx in range(nb)
+        ]
+    )
+    data = b"".join(
+        [pack(tobits(ie)), pack(tobits(io)), pack(qe_bits), pack(tobits(qo))]
+    )
 
-def test_decode_noise(noise_data, noise_ref_data):
-    shdata = noise_data[PHSIZE : PHSIZE + SHSIZE]
-    secondary_header = SecondaryHeader.frombytes(shdata)
+    # reference: one LUT per block
+    values = np.empty((4, nq), dtype=np.float32)
+    for bidx in range(nb):
+        lut = get_baq_lut(baqmod, int(thidx[bidx]))
+        blk = slice(bidx * blocksize, (bidx + 1) * blocksize)
+        values[:, blk] = lut[codes[:, blk]]
+    expected = align_quads(*values)
+
+    return data, expected
+
+
+@pytest.mark.parametrize("nq", [1, 127, 129, 1000])
+@pytest.mark.parametrize(
+    "baqmod", [EBaqMode.BAQ3, EBaqMode.BAQ4, EBaqMode.BAQ5]
+)
+def test_baq_decode(baqmod, nq):
+    data, expected = make_baq(nq, baqmod)
+    out = baq_decode(data, nq, baqmod)
+    assert out.dtype == np.complex64
+    npt.assert_array_equal(out, expected)
+
+    out = np.zeros(2 * nq, dtype=np.complex64)
+    assert baq_decode(data, nq, baqmod, out=out) is out
+    npt.assert_array_equal(out, expected)
+
+
+@pytest.mark.parametrize("nq", [129, 255, 1000])
+@pytest.mark.parametrize(
+    "baqmod", [EBaqMode.BAQ3, EBaqMode.BAQ4, EBaqMode.BAQ5]
+)
+def test_baq_decode_partial_block(baqmod, nq, blocksize=BLOCKSIZE):
+    nbits = baqmod.value
+    nb = -(-nq // blocksize)
+    nbytes = 2 * (3 * -(-nbits * nq // 16) + -(-(nbits * nq + 8 * nb) // 16))
+    data, expected = make_baq(nq, baqmod)
+    assert len(data) == nbytes
+    assert nq % blocksize != 0
+
+    out = baq_decode(data, nq, baqmod)
+    tail = 2 * (nq % blocksize)  # samples of the last (partial) block
+    npt.assert_array_equal(out[-tail:], expected[-tail:])
+    npt.assert_array_equal(out, expected)
+
+    with pytest.raises(ValueError):
+        baq_decode(data[:-1], nq, baqmod)
+
+
+@pytest.mark.parametrize("offset", [1, 3, 16])
+def test_baq_decode_offset(offset, nq=300):
+    # the user data field at a non-zero offset of a larger buffer
+    data, expected = make_baq(nq, EBaqMode.BAQ4)
+    buf = bytearray(b"\xff" * offset + data + b"\xff" * 5)
+    ud = memoryview(buf)[offset : offset + len(data)]
+    npt.assert_array_equal(baq_decode(ud, nq, EBaqMode.BAQ4), expected)
+    ud = np.frombuffer(buf, dtype=np.uint8)[offset:]
+    npt.assert_array_equal(baq_decode(ud, nq, EBaqMode.BAQ4), expected)
+    assert buf == b"\xff" * offset + data + b"\xff" * 5  # no writes
+
+
+def test_huffman_decode_fdbaq(fdbaq_stream, blocksize=BLOCKSIZE):
+    bits, values, brcs, thidx = fdbaq_stream
+    nq = len(values[0])
+    expected = huffman_decode(bits, nq, blocksize=blocksize)
+
+    data = np.packbits(bits)
+    result = huffman.decode_fdbaq(data, nq, blocksize)
+    for array, ref in zip(result, expected):
+        np.testing.assert_array_equal(array, ref)
+
+    with pytest.raises(huffman.HuffmanDecodingError):
+        huffman.decode_fdbaq(data[: len(data) // 2], nq, blocksize)
+
+    data[0] |= 0xE0  # invalid BRC (7)
+    with pytest.raises(huffman.HuffmanDecodingError):
+        huffman.decode_fdbaq(data, nq, blocksize)
+
+
+@pytest.mark.parametrize(
+    "kind, signal_type",
+    [("txcal", ESignalType.TX_CAL), ("noise", ESignalType.NOISE)],
+    ids=["txcal", "noise"],
+)
+def test_decode_exact(request, kind, signal_type):
+    isp_data = request.getfixturevalue(f"{kind}_data")
+    secondary_header = request.getfixturevalue(f"{kind}_secondary_header")
+    ref_data = request.getfixturevalue(f"{kind}_ref_data")
 
     rcss = secondary_header.radar_configuration_support
-    assert rcss.ses.signal_type == ESignalType.NOISE
+    assert rcss.ses.signal_type == signal_type
 
     nq = secondary_header.radar_sample_count.number_of_quads
     baqmod = rcss.baq_mode
     tstmod = secondary_header.fixed_ancillary_data.test_mode
-    data = decode_ud(noise_data[PHSIZE + SHSIZE :], nq, baqmod, tstmod)
-    np.testing.assert_array_equal(data, noise_ref_data["udf"])
+    data = decode_ud(isp_data[PHSIZE + SHSIZE :], nq, baqmod, tstmod)
+    np.testing.assert_array_equal(data, ref_data["udf"])
 
 
-def test_decode_echo(echo_data, echo_ref_data):
-    shdata = echo_data[PHSIZE : PHSIZE + SHSIZE]
-    secondary_header = SecondaryHeader.frombytes(shdata)
+def test_decode_echo(echo_data, echo_secondary_header, echo_ref_data):
+    secondary_header = echo_secondary_header
 
     rcss = secondary_header.radar_configuration_support
     assert rcss.ses.signal_type == ESignalType.ECHO
@@ -220,8 +390,93 @@ def test_decode_echo(echo_data, echo_ref_data):
     baqmod = rcss.baq_mode
     tstmod = secondary_header.fixed_ancillary_data.test_mode
     data = decode_ud(echo_data[PHSIZE + SHSIZE :], nq, baqmod, tstmod)
-    np.testing.assert_allclose(data.real, echo_ref_data["udf"].real, atol=2e-6)
-    np.testing.assert_allclose(data.imag, echo_ref_data["udf"].imag, atol=2e-6)
-    np.testing.assert_allclose(
-        np.abs(data), np.abs(echo_ref_data["udf"]), atol=3e-6
+    # complex comparison: bounds the modulus of the error
+    np.testing.assert_allclose(data, echo_ref_data["udf"], rtol=0, atol=3e-6)
+
+
+def test_get_data_format_type():
+    assert (
+        get_data_format_type(EBaqMode.BYPASS, ETestMode.BYPASS)
+        is EDataFormatType.A
+    )
+    assert (
+        get_data_format_type(EBaqMode.BAQ4, ETestMode.OPER)
+        is EDataFormatType.C
+    )
+    # raw int values
+    assert (
+        get_data_format_type(int(EBaqMode.FDBAQ_MODE_1), int(ETestMode.OPER))
+        is EDataFormatType.D
+    )
+    with pytest.raises(ValueError):
+        get_data_format_type(EBaqMode.BAQ3, ETestMode.BYPASS)
+
+
+def test_reconstruct():
+    nq, blocksize = 300, 128
+    rng = np.random.default_rng(0)
+    luts = rng.normal(size=(3, 8)).astype(np.float32)
+    ie, io, qe, qo = rng.integers(0, 8, size=(4, nq), dtype=np.uint8)
+    block = np.arange(nq) // blocksize
+    expected = align_quads(
+        luts[block, ie], luts[block, io], luts[block, qe], luts[block, qo]
+    )
+
+    data = _udf.reconstruct(luts, ie, io, qe, qo, nq, blocksize)
+    assert data.shape == (nq, 4)
+    npt.assert_array_equal(data.view(np.complex64).ravel(), expected)
+
+    out = np.zeros(2 * nq, dtype=np.complex128)
+    _reconstruct(luts, ie, io, qe, qo, nq, blocksize, out=out)
+    npt.assert_array_equal(out, expected)
+
+    with pytest.raises(IndexError):
+        _udf.reconstruct(luts[:, :4].copy(), ie, io, qe, qo, nq, blocksize)
+    with pytest.raises(ValueError):
+        _udf.reconstruct(luts[:2], ie, io, qe, qo, nq, blocksize)
+
+
+def test_decode_ud_batch(
+    stream_file, noise_ref_data, txcal_ref_data, echo_ref_data
+):
+    data = stream_file.read_bytes()
+    offsets = scan_stream(stream_file)[:-1]
+    ph = bulk.decode_primary_headers(data, offsets)
+    sh = bulk.decode_secondary_headers(data, offsets)
+    nqs = sh["number_of_quads"]
+
+    args = (
+        data,
+        np.asarray(offsets) + PHSIZE + SHSIZE,
+        ph["packet_data_length"] + 1 - SHSIZE,
+        nqs,
+        sh["baq_mode"],
+        sh["test_mode"],
     )
+    out = decode_ud_batch(*args)
+
+    starts = 2 * np.cumsum([0, *nqs.tolist()])
+    assert out.dtype == np.complex64
+    assert out.size == starts[-1]
+    ref_data = [noise_ref_data, txcal_ref_data, echo_ref_data]
+    for idx, ref in enumerate(ref_data):
+        chunk = out[starts[idx] : starts[idx + 1]]
+        np.testing.assert_allclose(chunk, ref["udf"], atol=3e-6)
+
+    npt.assert_array_equal(decode_ud_batch(*args, max_workers=2), out)
+
+    empty = decode_ud_batch(data, [], [], [], [], [])
+    assert empty.shape == (0,)
+
+    with pytest.raises(ValueError):
+        decode_ud_batch(data, offsets[:1], [100], [10], [12], [7])
+    with pytest.raises(ValueError, match="Inconsistent input lengths"):
+        decode_ud_batch(*args[:-1], sh["test_mode"][:2])
+    with pytest.raises(ValueError, match="Invalid output array size"):
+        decode_ud_batch(*args, out=np.empty(out.size - 1, np.complex64))
+    with pytest.raises(ValueError, match="Invalid output array dim"):
+        decode_ud_batch(*args, out=np.empty((out.size, 1), np.complex64))
+    with pytest.raises(ValueError, match="Invalid output array dtype"):
+        decode_ud_batch(*args, out=np.empty(out.size, np.complex128))
+    with pytest.raises(ValueError, match="not C-contiguous"):
+        decode_ud_batch(*args, out=np.empty(2 * out.size, np.complex64)[::2])